@@ -0,0 +1,36 @@
+"""
+Database Migration Script for Performance Indexes
+Run this to add the indexes declared in models.py to an existing database.
+New databases get them automatically through Base.metadata.create_all.
+
+Usage: python add_performance_indexes.py
+"""
+
+from database import engine
+import models
+
+def add_performance_indexes():
+    """Create every index declared on the models that does not exist yet"""
+
+    print("🔄 Adding performance indexes...")
+
+    try:
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+                print(f"✅ {table.name}: {index.name}")
+
+        print("\n✅ Migration completed successfully!")
+        print("\nNext steps:")
+        print("1. Restart your backend server")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("\nTroubleshooting:")
+        print("1. Make sure the backend server is not running")
+        print("2. Check that DATABASE_URL is correctly set in your .env file")
+        print("3. Ensure you have write permissions to the database file")
+        print("4. uq_appt_doctor_slot needs existing double bookings cancelled first")
+
+if __name__ == "__main__":
+    add_performance_indexes()
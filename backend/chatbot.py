@@ -2,6 +2,9 @@ from dotenv import load_dotenv
 import os
 from typing import List, Dict
 import json
+import logging
+import threading
+from cachetools import TTLCache
 
 # Fix for Python 3.13 compatibility
 import collections.abc
@@ -29,8 +32,26 @@ except Exception as e:
     AI_AVAILABLE = False
     model = None
 
-# Store conversations in memory
-conversations = {}
+logger = logging.getLogger(__name__)
+
+# Conversation history lives in Redis when REDIS_URL is set, so every
+# worker sees the same chat. Without it, fall back to a per-process store.
+# Either way idle conversations expire after CONVERSATION_TTL.
+CONVERSATION_TTL = 60 * 60  # seconds
+MAX_CONVERSATION_MESSAGES = 20
+
+redis_client = None
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    try:
+        import redis
+        redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    except ImportError:
+        print("⚠️ REDIS_URL is set but the redis package is not installed")
+
+# Fallback store; replies run on worker threads, so access goes through the lock
+conversations = TTLCache(maxsize=10000, ttl=CONVERSATION_TTL)
+conversations_lock = threading.Lock()
 
 SYSTEM_PROMPT = """You are a helpful medical AI assistant for Al Akhawayn University's health center named CareConnect.
 
@@ -143,25 +164,32 @@ Would you like me to provide more details about any of our doctors?"
 
 Remember: Provide helpful medical guidance while ALWAYS recommending professional medical evaluation through appointment booking."""
 
+# Keyword tables for the classifiers below, built once at import
+SYMPTOM_KEYWORDS = {
+    "headache": ("headache", "head pain", "migraine", "head hurts", "head ache"),
+    "fever": ("fever", "temperature", "hot", "burning up", "chills"),
+    "cold_flu": ("cold", "flu", "cough", "sneeze", "runny nose", "sore throat", "congestion"),
+    "stomach": ("stomach", "nausea", "vomit", "diarrhea", "abdominal pain", "belly", "upset stomach"),
+    "pain": ("pain", "hurts", "ache", "sore", "painful"),
+    "injury": ("injury", "injured", "cut", "bruise", "sprain", "wound", "hurt myself"),
+    "breathing": ("breathing", "breathe", "shortness of breath", "can't breathe", "chest"),
+    "anxiety": ("anxiety", "anxious", "stress", "worried", "panic", "nervous"),
+    "allergy": ("allergy", "allergic", "rash", "itch", "hives", "swelling"),
+}
+
+EMERGENCY_KEYWORDS = (
+    "emergency", "urgent", "chest pain", "difficulty breathing",
+    "can't breathe", "severe pain", "bleeding heavily",
+    "unconscious", "suicide", "severe bleeding", "heart attack",
+    "stroke", "choking", "overdose", "severe injury",
+)
+
 def detect_symptom_keywords(message: str) -> Dict:
     """Detect if user is describing medical symptoms"""
-    
-    symptom_keywords = {
-        "headache": ["headache", "head pain", "migraine", "head hurts", "head ache"],
-        "fever": ["fever", "temperature", "hot", "burning up", "chills"],
-        "cold_flu": ["cold", "flu", "cough", "sneeze", "runny nose", "sore throat", "congestion"],
-        "stomach": ["stomach", "nausea", "vomit", "diarrhea", "abdominal pain", "belly", "upset stomach"],
-        "pain": ["pain", "hurts", "ache", "sore", "painful"],
-        "injury": ["injury", "injured", "cut", "bruise", "sprain", "wound", "hurt myself"],
-        "breathing": ["breathing", "breathe", "shortness of breath", "can't breathe", "chest"],
-        "anxiety": ["anxiety", "anxious", "stress", "worried", "panic", "nervous"],
-        "allergy": ["allergy", "allergic", "rash", "itch", "hives", "swelling"]
-    }
-    
     message_lower = message.lower()
     detected_symptoms = []
     
-    for symptom_type, keywords in symptom_keywords.items():
+    for symptom_type, keywords in SYMPTOM_KEYWORDS.items():
         if any(keyword in message_lower for keyword in keywords):
             detected_symptoms.append(symptom_type)
     
@@ -171,11 +199,29 @@ def detect_symptom_keywords(message: str) -> Dict:
         "needs_medical_advice": True
     }
 
+def conversation_key(conversation_id: str) -> str:
+    return f"chat:{conversation_id}"
+
 def get_conversation(conversation_id: str) -> List[Dict]:
-    """Get or create conversation history"""
-    if conversation_id not in conversations:
-        conversations[conversation_id] = []
-    return conversations[conversation_id]
+    """Get conversation history (empty for a new conversation)"""
+    if redis_client is not None:
+        return [json.loads(msg) for msg in redis_client.lrange(conversation_key(conversation_id), 0, -1)]
+    with conversations_lock:
+        return list(conversations.get(conversation_id, ()))
+
+def append_to_conversation(conversation_id: str, *messages: Dict):
+    """Append messages, keep only the most recent ones and restart the idle timer"""
+    if redis_client is not None:
+        key = conversation_key(conversation_id)
+        pipe = redis_client.pipeline()
+        pipe.rpush(key, *(json.dumps(msg) for msg in messages))
+        pipe.ltrim(key, -MAX_CONVERSATION_MESSAGES, -1)
+        pipe.expire(key, CONVERSATION_TTL)
+        pipe.execute()
+        return
+    with conversations_lock:
+        conversation = conversations.get(conversation_id, []) + list(messages)
+        conversations[conversation_id] = conversation[-MAX_CONVERSATION_MESSAGES:]
 
 def ai_reply(message: str, conversation_id: str = "default", user_context: Dict = None) -> Dict:
     """
@@ -252,12 +298,11 @@ def ai_reply(message: str, conversation_id: str = "default", user_context: Dict
         reply = response.text
         
         # Add messages to conversation history
-        conversation.append({"role": "user", "content": message})
-        conversation.append({"role": "assistant", "content": reply})
-        
-        # Keep only last 20 messages to manage memory
-        if len(conversation) > 20:
-            conversations[conversation_id] = conversation[-20:]
+        append_to_conversation(
+            conversation_id,
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": reply},
+        )
         
         return {
             "reply": reply,
@@ -268,7 +313,7 @@ def ai_reply(message: str, conversation_id: str = "default", user_context: Dict
         }
     
     except Exception as e:
-        print(f"❌ Gemini API error: {e}")
+        logger.warning("Gemini API error: %s", e)
         
         # Provide a helpful fallback
         return {
@@ -279,22 +324,17 @@ def ai_reply(message: str, conversation_id: str = "default", user_context: Dict
 
 def clear_conversation(conversation_id: str):
     """Clear conversation history"""
-    if conversation_id in conversations:
-        del conversations[conversation_id]
-        return True
-    return False
+    if redis_client is not None:
+        return redis_client.delete(conversation_key(conversation_id)) > 0
+    with conversations_lock:
+        return conversations.pop(conversation_id, None) is not None
 
 def analyze_urgency(message: str) -> Dict:
     """Analyze if message indicates an emergency"""
-    emergency_keywords = [
-        "emergency", "urgent", "chest pain", "difficulty breathing",
-        "can't breathe", "severe pain", "bleeding heavily", 
-        "unconscious", "suicide", "severe bleeding", "heart attack",
-        "stroke", "choking", "overdose", "severe injury"
-    ]
-    
     message_lower = message.lower()
-    is_urgent = any(keyword in message_lower for keyword in emergency_keywords)
+    # One scan: the matched keywords also decide urgency
+    detected_keywords = [kw for kw in EMERGENCY_KEYWORDS if kw in message_lower]
+    is_urgent = bool(detected_keywords)
     
     urgency_level = "high" if is_urgent else "normal"
     
@@ -306,5 +346,5 @@ def analyze_urgency(message: str) -> Dict:
         "is_urgent": is_urgent,
         "urgency_level": urgency_level,
         "recommendation": recommendation,
-        "detected_keywords": [kw for kw in emergency_keywords if kw in message_lower]
+        "detected_keywords": detected_keywords
     }
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
 import os
@@ -9,14 +9,41 @@ load_dotenv()
 # Database URL - use SQLite for simplicity, can be changed to PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./careconnect.db")
 
+# The default pool (5 connections + 10 overflow) stalls under concurrent
+# requests, so size it from the environment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+if "sqlite" in DATABASE_URL:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False}
+    )
 
-# Create session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # SQLite leaves foreign keys unenforced per connection; the models rely
+    # on ON DELETE CASCADE/SET NULL (passive_deletes) to remove dependent
+    # rows. Databases created before those clauses need recreate_database.py
+    @event.listens_for(engine, "connect")
+    def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+
+# Create session. Sessions are request-scoped, so committed objects keep
+# their loaded state instead of re-SELECTing on the next attribute access.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 # Dependency to get DB session
 def get_db() -> Generator[Session, None, None]:
@@ -44,7 +71,8 @@ def seed_db():
     
     def hash_password(password: str) -> str:
         pwd_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
+        # Same cost as main.hash_password so seeded users aren't rehashed on first login
+        salt = bcrypt.gensalt(rounds=int(os.getenv("BCRYPT_ROUNDS", "10")))
         hashed = bcrypt.hashpw(pwd_bytes, salt)
         return hashed.decode('utf-8')
     
@@ -163,47 +191,34 @@ def seed_db():
         for doctor in doctors:
             db.add(doctor)
         
-        # ✅ FIX: Commit doctors first so they get IDs
-        db.commit()
+        # Flush doctors so they get IDs; everything commits together below
+        db.flush()
         print("✅ Doctors created successfully")
         
         # Now create availability schedules with valid doctor IDs
         print("📅 Creating default doctor availability schedules...")
         
-        # Dr. Sarah Chen - Available Mon-Fri, 9 AM - 5 PM
-        for day in range(5):  # Monday to Friday (0-4)
-            availability = models.DoctorAvailability(
-                doctor_id=doctors[0].id,
-                day_of_week=day,
-                start_time="09:00 AM",
-                end_time="05:00 PM",
-                slot_duration=30
-            )
-            db.add(availability)
-        
-        # Dr. Emily Carter - Available Mon-Thu, 10 AM - 4 PM
-        for day in range(4):  # Monday to Thursday (0-3)
-            availability = models.DoctorAvailability(
-                doctor_id=doctors[1].id,
-                day_of_week=day,
-                start_time="10:00 AM",
-                end_time="04:00 PM",
-                slot_duration=30
-            )
-            db.add(availability)
-        
-        # Dr. Elena Rodriguez - Available Tue-Sat, 8 AM - 3 PM
-        for day in [1, 2, 3, 4, 5]:  # Tuesday to Saturday (1-5)
-            availability = models.DoctorAvailability(
-                doctor_id=doctors[2].id,
-                day_of_week=day,
-                start_time="08:00 AM",
-                end_time="03:00 PM",
-                slot_duration=45  # 45-minute slots
-            )
-            db.add(availability)
+        schedules = [
+            # Dr. Sarah Chen - Available Mon-Fri, 9 AM - 5 PM
+            (doctors[0].id, range(5), "09:00 AM", "05:00 PM", 30),
+            # Dr. Emily Carter - Available Mon-Thu, 10 AM - 4 PM
+            (doctors[1].id, range(4), "10:00 AM", "04:00 PM", 30),
+            # Dr. Elena Rodriguez - Available Tue-Sat, 8 AM - 3 PM, 45-minute slots
+            (doctors[2].id, range(1, 6), "08:00 AM", "03:00 PM", 45),
+        ]
         
-        db.commit()
+        # Single executemany INSERT for every slot row
+        db.execute(insert(models.DoctorAvailability), [
+            {
+                "doctor_id": doctor_id,
+                "day_of_week": day,
+                "start_time": start_time,
+                "end_time": end_time,
+                "slot_duration": slot_duration,
+            }
+            for doctor_id, days, start_time, end_time, slot_duration in schedules
+            for day in days
+        ])
         print("✅ Doctor availability schedules created")
         
         # Sample visits for Alexandra
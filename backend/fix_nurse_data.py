@@ -88,13 +88,13 @@ def fix_nurse_data():
         db.commit()
         print("\n✅ Migration completed successfully!")
 
-        # Show summary
-        total_nurses = db.query(Nurse).count()
+        # Show summary; the listing below loads every nurse anyway, so
+        # count those rows instead of issuing a separate COUNT query
+        all_nurses = db.query(Nurse).all()
         print(f"\nSummary:")
-        print(f"  Total nurses in system: {total_nurses}")
+        print(f"  Total nurses in system: {len(all_nurses)}")
 
         # List all nurses
-        all_nurses = db.query(Nurse).all()
         for nurse in all_nurses:
             print(f"    - {nurse.name} (Dept: {nurse.department}, License: {nurse.license_number})")
 
@@ -1,9 +1,13 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
+from functools import lru_cache
 import jwt
 
 # Support all PyJWT versions - create our own exception classes if needed
@@ -26,42 +30,120 @@ except (ImportError, AttributeError):
             """Invalid token error"""
             pass
 
+import anyio
+import asyncio
 import bcrypt
+import hashlib
+import logging
+import orjson
 import os
+import threading
+import time
+from cachetools import TTLCache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
 from dotenv import load_dotenv
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import bindparam, select, insert, update, exists, false, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, joinedload, raiseload
+from database import get_db, engine, SessionLocal, DB_POOL_SIZE, DB_MAX_OVERFLOW
 import models
 
+try:
+    from chatbot import ai_reply
+except ImportError:
+    ai_reply = None
+
 load_dotenv()
 
-app = FastAPI(title="CareConnect Health System API")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="CareConnect Health System API",
+    default_response_class=ORJSONResponse,
+)
 
 # ---------------------------------------------------------
 # CORS CONFIG
 # ---------------------------------------------------------
+# Comma-separated list, e.g. CORS_ORIGINS=https://careconnect.aui.ma
+# Defaults to "*" so the static frontend keeps working in development.
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # let browsers cache preflight responses for a day
 )
 
+# ---------------------------------------------------------
+# REQUEST LATENCY
+# ---------------------------------------------------------
+# Rolling window of recent request durations (ms), reported by /debug/pool
+_request_latencies = deque(maxlen=1000)
+
+
+class LatencyMiddleware:
+    """Plain ASGI middleware that records how long each HTTP request takes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_latencies.append((time.perf_counter() - start) * 1000)
+
+
+app.add_middleware(LatencyMiddleware)
+
+# ---------------------------------------------------------
+# COMPRESSION
+# ---------------------------------------------------------
+# List endpoints return repetitive JSON; only bodies over 500 bytes are
+# compressed, and only for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 # ---------------------------------------------------------
 # SECURITY
 # ---------------------------------------------------------
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+SECRET_KEY_BYTES = SECRET_KEY.encode()
 ALGORITHM = "HS256"
+ACCESS_TOKEN_LIFETIME = 24 * 60 * 60  # seconds
+# Only exp and sub carry meaning in our tokens; skip the aud/iss checks
+JWT_DECODE_OPTIONS = {"verify_aud": False, "verify_iss": False, "require": ["exp", "sub"]}
 security = HTTPBearer()
 
+# Verified tokens map to (user_id, expires_at) so repeat requests skip
+# jwt.decode and the username lookup. Invalid tokens are cached briefly
+# with user_id=None so junk tokens can't force a decode on every call.
+TOKEN_CACHE_TTL = 30
+INVALID_TOKEN_CACHE_TTL = 5
+_token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
 
 # ---------------------------------------------------------
 # PASSWORD HASHING
 # ---------------------------------------------------------
+# Cost factor for new hashes; each +1 doubles the CPU time per hash/verify
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+
+
 def hash_password(password: str) -> str:
     pwd_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -73,14 +155,79 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash was made with a cost other than BCRYPT_ROUNDS"""
+    # bcrypt hashes look like $2b$12$<salt+hash>; the cost is the third field
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# bcrypt is CPU-bound and slow by design, so it gets a dedicated pool:
+# hashing never blocks the event loop or ties up the request threadpool
+BCRYPT_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="bcrypt")
+
+
+async def ahash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(BCRYPT_POOL, hash_password, password)
+
+
+# Successful verifications are remembered briefly so repeat logins skip
+# bcrypt. Keys are a keyed BLAKE2b digest (per-process random key) of the
+# password and stored hash, so a leaked cache entry can't be brute-forced
+# offline and a password change naturally misses. Failures are never cached.
+VERIFY_CACHE_TTL = 10
+_verify_cache_key = os.urandom(32)
+_verify_cache = TTLCache(maxsize=4096, ttl=VERIFY_CACHE_TTL)
+_verify_cache_lock = threading.Lock()
+
+
+def _verify_cache_digest(plain_password: str, hashed_password: str) -> bytes:
+    digest = hashlib.blake2b(key=_verify_cache_key, digest_size=32)
+    digest.update(plain_password.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(hashed_password.encode("utf-8"))
+    return digest.digest()
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    cache_key = _verify_cache_digest(plain_password, hashed_password)
+    with _verify_cache_lock:
+        if cache_key in _verify_cache:
+            return True
+
+    loop = asyncio.get_running_loop()
+    verified = await loop.run_in_executor(BCRYPT_POOL, verify_password, plain_password, hashed_password)
+    if verified:
+        with _verify_cache_lock:
+            _verify_cache[cache_key] = True
+    return verified
+
+
+@lru_cache(maxsize=1024)
 def generate_aui_email(full_name: str) -> str:
     """Generate AUI email: (first letter).(lastname)@aui.ma"""
-    names = full_name.strip().split()
+    names = full_name.split()
     if len(names) >= 2:
         return f"{names[0][0].lower()}.{names[-1].lower()}@aui.ma"
     return f"{names[0].lower()}@aui.ma"
 
 
+def generate_initials(full_name: str) -> str:
+    """Avatar initials from the first two names, e.g. 'Sarah Chen' -> 'SC'"""
+    name_parts = full_name.split()
+    if len(name_parts) >= 2:
+        return ''.join(n[0].upper() for n in name_parts[:2])
+    return full_name[:2].upper()
+
+
+# Allowed values for student departments and medical record entries
+DEPARTMENTS = frozenset({"SSE", "SBA", "SSAH"})
+MEDICAL_ENTRY_TYPES = frozenset({"allergy", "medication", "condition"})
+
+
 # ---------------------------------------------------------
 # Pydantic Schemas
 # ---------------------------------------------------------
@@ -92,6 +239,10 @@ class AppointmentCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class BulkAppointmentCreate(AppointmentCreate):
+    patient_id: int
+
+
 class AppointmentUpdate(BaseModel):
     appointment_date: Optional[str] = None
     appointment_time: Optional[str] = None
@@ -123,14 +274,14 @@ class UserRegister(BaseModel):
     shift: Optional[str] = None
     # Common fields
     phone: Optional[str] = None
-    date_of_birth: Optional[str] = None
+    date_of_birth: Optional[date] = None
     gender: Optional[str] = None
 
 
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     phone: Optional[str] = None
-    date_of_birth: Optional[str] = None
+    date_of_birth: Optional[date] = None
     gender: Optional[str] = None
     department: Optional[str] = None
     major: Optional[str] = None
@@ -149,7 +300,7 @@ class MedicalEntryCreate(BaseModel):
     name: str
     description: Optional[str] = None
     severity: Optional[str] = None
-    diagnosed_date: Optional[str] = None
+    diagnosed_date: Optional[date] = None
 
 
 class MedicalEntryUpdate(BaseModel):
@@ -222,36 +373,99 @@ class DoctorMedicalRecordCreate(BaseModel):
     description: Optional[str] = None
 
 
+# Response schemas: declared as response_model so FastAPI validates and
+# serializes list payloads through pydantic-core instead of jsonable_encoder.
+# Endpoints that return a prebuilt Response bypass response_model, so they
+# list their schema under responses= for the docs only.
+class DoctorOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    specialty: Optional[str] = None
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+    avatar: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    is_available: Optional[bool] = None
+
+class VisitOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    date: date
+    time_start: Optional[str] = None
+    time_end: Optional[str] = None
+    doctor_name: str
+    diagnosis: Optional[str] = None
+    type: Optional[str] = None
+    location: Optional[str] = None
+    notes: Optional[str] = None
+    status: Optional[str] = None
+
+class VisitStatistics(BaseModel):
+    total: int
+    upcoming: int
+    completed: int
+    cancelled: int
+
+class VisitHistoryOut(BaseModel):
+    statistics: VisitStatistics
+    visits: List[VisitOut]
+
+class ProfessionalExperienceOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    position: str
+    institution: str
+    start_date: date
+    end_date: Optional[date] = None
+    description: Optional[str] = None
+    is_current: Optional[bool] = None
+
+
 # ---------------------------------------------------------
 # TOKEN & AUTH
 # ---------------------------------------------------------
 def create_access_token(data: dict):
     payload = data.copy()
-    payload["exp"] = datetime.utcnow() + timedelta(hours=24)
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    payload["exp"] = int(time.time()) + ACCESS_TOKEN_LIFETIME
+    return jwt.encode(payload, SECRET_KEY_BYTES, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
+def _cache_token(cache_key: bytes, user_id: Optional[int], expires_at: float):
+    with _token_cache_lock:
+        _token_cache[cache_key] = (user_id, expires_at)
 
-        user = db.query(models.User).filter(
-            models.User.username == username
-        ).first()
 
+def resolve_user(credentials: HTTPAuthorizationCredentials, db: Session, load_options=()):
+    """Authenticate the bearer token and load its user with the given loader options"""
+    token = credentials.credentials
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+
+    if cached and cached[1] > time.time():
+        user_id = cached[0]
+        if user_id is None:
+            raise HTTPException(401, "Invalid token")
+
+        user = db.get(models.User, user_id, options=load_options)
         if not user:
             raise HTTPException(401, "User not found")
-
         return user
 
+    try:
+        payload = jwt.decode(
+            token, SECRET_KEY_BYTES, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS
+        )
     except ExpiredSignatureError:
         raise HTTPException(401, "Token expired")
     except InvalidTokenError:
+        _cache_token(cache_key, None, time.time() + INVALID_TOKEN_CACHE_TTL)
         raise HTTPException(401, "Invalid token")
     except Exception as e:
         # Catch any other JWT-related exceptions
@@ -259,6 +473,136 @@ def get_current_user(
             raise HTTPException(401, "Token expired")
         raise HTTPException(401, "Invalid token")
 
+    username = payload["sub"]
+
+    user = db.execute(
+        select(models.User).options(*load_options).where(models.User.username == username)
+    ).unique().scalar_one_or_none()
+
+    if not user:
+        raise HTTPException(401, "User not found")
+
+    # Never cache past the token's own expiry
+    _cache_token(cache_key, user.id, min(time.time() + TOKEN_CACHE_TTL, payload.get("exp", 0)))
+    return user
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    return resolve_user(credentials, db)
+
+
+def get_current_user_full(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Current user with emergency contact and doctor profile joined in the same query"""
+    return resolve_user(credentials, db, eager(
+        joinedload(models.User.emergency_contact),
+        joinedload(models.User.doctor_profile),
+    ))
+
+
+def require_nurse(current_user: models.User = Depends(get_current_user)):
+    """Current user, rejected with 403 unless they are a nurse"""
+    if current_user.role != "nurse":
+        raise HTTPException(403, "Access denied. Nurses only.")
+    return current_user
+
+
+def get_current_doctor(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Doctor profile of the current user, loaded in the same query as the user"""
+    user = resolve_user(credentials, db, (joinedload(models.User.doctor_profile),))
+    if user.role != "doctor":
+        raise HTTPException(403, "Access denied. Doctors only.")
+    if not user.doctor_profile:
+        raise HTTPException(404, "Doctor profile not found")
+    return user.doctor_profile
+
+
+def get_current_nurse(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Nurse profile of the current user, loaded in the same query as the user"""
+    user = resolve_user(credentials, db, (joinedload(models.User.nurse_profile),))
+    if user.role != "nurse":
+        raise HTTPException(403, "Access denied. Nurses only.")
+    if not user.nurse_profile:
+        raise HTTPException(404, "Nurse profile not found")
+    return user.nurse_profile
+
+
+# ---------------------------------------------------------
+# EAGER LOADING
+# ---------------------------------------------------------
+# List endpoints select plain columns; queries that do load ORM objects
+# with relationships wrap their loader options in eager(). Set
+# SQL_RAISELOAD=1 in development to make those raise on any relationship
+# they didn't eager-load, instead of silently issuing extra SELECTs
+SQL_RAISELOAD = os.getenv("SQL_RAISELOAD", "0") == "1"
+
+
+def eager(*options):
+    """Loader options for an ORM query, plus raiseload('*') when SQL_RAISELOAD is on"""
+    return (*options, raiseload("*")) if SQL_RAISELOAD else options
+
+
+# ---------------------------------------------------------
+# STREAMING RESPONSES
+# ---------------------------------------------------------
+STREAM_BATCH_SIZE = 500
+
+
+def stream_json_rows(stmt, head: bytes = b"[", tail: bytes = b"]"):
+    """Encode a select's rows as a JSON array, batch by batch
+
+    head and tail wrap the rows, so the array can be embedded in a larger
+    JSON object. Runs on its own session: the request's get_db session is
+    closed before a streaming body is sent.
+    """
+    with SessionLocal() as db:
+        result = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+        ).mappings()
+        yield head
+        separator = b""
+        for batch in result.partitions():
+            yield separator + b",".join(orjson.dumps(dict(row)) for row in batch)
+            separator = b","
+        yield tail
+
+
+def json_rows_response(stmt, head: bytes = b"[", tail: bytes = b"]") -> StreamingResponse:
+    return StreamingResponse(stream_json_rows(stmt, head, tail), media_type="application/json")
+
+
+# ---------------------------------------------------------
+# RESPONSE CACHES
+# ---------------------------------------------------------
+# Dashboard reads that every client polls. Writes that change them drop
+# the entry on this worker; the short TTLs bound staleness on the others.
+DOCTORS_CACHE_TTL = 60
+NURSE_STATS_CACHE_TTL = 10
+_doctors_cache = TTLCache(maxsize=1, ttl=DOCTORS_CACHE_TTL)
+_nurse_stats_cache = TTLCache(maxsize=2, ttl=NURSE_STATS_CACHE_TTL)
+_response_cache_lock = threading.Lock()
+
+
+def invalidate_doctors_list():
+    with _response_cache_lock:
+        _doctors_cache.clear()
+
+
+def invalidate_nurse_stats():
+    with _response_cache_lock:
+        _nurse_stats_cache.clear()
+
 
 # ---------------------------------------------------------
 # ROOT
@@ -276,71 +620,83 @@ def root():
 # AUTH
 # ---------------------------------------------------------
 @app.post("/auth/register")
-def register(user: UserRegister, db: Session = Depends(get_db)):
-    # Check if username already exists
-    existing_user = db.query(models.User).filter(
-        models.User.username == user.username
-    ).first()
-    
-    if existing_user:
+async def register(user: UserRegister, db: Session = Depends(get_db)):
+    # Validate first so rejected requests never pay for a bcrypt hash
+    await run_in_threadpool(validate_registration, user, db)
+    password_hash = await ahash_password(user.password)
+    return await run_in_threadpool(create_registered_user, user, password_hash, db)
+
+
+def validate_registration(user: UserRegister, db: Session):
+    """Raise if the registration conflicts with existing data or misses role fields"""
+    # Check username (and student_id for students) as two EXISTS probes in a
+    # single query, so each conflict keeps its own message
+    username_taken, student_id_taken = db.execute(select(
+        exists().where(models.User.username == user.username),
+        exists().where(models.User.student_id == user.student_id)
+        if user.role == "student" else false(),
+    )).one()
+
+    if username_taken:
         raise HTTPException(400, "Username already exists")
-
-    # For students, check if student_id already exists
-    if user.role == "student":
-        existing_student = db.query(models.User).filter(
-            models.User.student_id == user.student_id
-        ).first()
-        if existing_student:
-            raise HTTPException(400, "Student ID already exists")
+    if student_id_taken:
+        raise HTTPException(400, "Student ID already exists")
 
     # Validate role-specific fields
     if user.role == "student":
         if not user.department or not user.major:
             raise HTTPException(400, "Department and Major required for students")
-        if user.department not in ["SSE", "SBA", "SSAH"]:
+        if user.department not in DEPARTMENTS:
             raise HTTPException(400, "Invalid department. Must be SSE, SBA, or SSAH")
     elif user.role == "doctor":
         if not user.license_number or not user.specialization:
             raise HTTPException(400, "License number and Specialization required for doctors")
         # Check if license number already exists
-        existing_doctor = db.query(models.Doctor).filter(
-            models.Doctor.license_number == user.license_number
-        ).first()
-        if existing_doctor:
+        license_taken = db.query(
+            exists().where(models.Doctor.license_number == user.license_number)
+        ).scalar()
+        if license_taken:
             raise HTTPException(400, "License number already registered")
     elif user.role == "nurse":
         if not user.nursing_license or not user.nurse_department:
             raise HTTPException(400, "Nursing license and Department required for nurses")
         # Check if nursing license already exists
-        existing_nurse = db.query(models.Nurse).filter(
-            models.Nurse.license_number == user.nursing_license
-        ).first()
-        if existing_nurse:
+        license_taken = db.query(
+            exists().where(models.Nurse.license_number == user.nursing_license)
+        ).scalar()
+        if license_taken:
             raise HTTPException(400, "Nursing license number already registered")
     else:
         raise HTTPException(400, "Invalid role. Must be 'student', 'doctor', or 'nurse'")
 
+
+def create_registered_user(user: UserRegister, password_hash: str, db: Session):
+    """Insert the user (plus doctor/nurse profile) and return the login payload"""
     # Generate AUI email
     email = generate_aui_email(user.full_name)
     
-    # Check if email already exists and make it unique if needed
-    base_email = email
+    # Check if email already exists and make it unique if needed.
+    # All taken variants are fetched at once, then the first free suffix
+    # is picked locally instead of querying once per collision.
+    local_part, domain = email.split('@')
+    taken_emails = {
+        row.email for row in db.query(models.User.email).filter(
+            models.User.email.startswith(local_part, autoescape=True)
+        )
+    }
     counter = 1
-    while db.query(models.User).filter(models.User.email == email).first():
-        name_parts = base_email.split('@')
-        email = f"{name_parts[0]}{counter}@{name_parts[1]}"
+    while email in taken_emails:
+        email = f"{local_part}{counter}@{domain}"
         counter += 1
 
     # Generate student_id for doctors and nurses if not provided properly
     if user.role == "doctor":
         # Use a numeric ID for doctors based on timestamp
-        import time
-        doctor_id = str(int(time.time()))[-7:]  # Last 7 digits of timestamp
+        doctor_id = f"{int(time.time()):07d}"[-7:]  # Last 7 digits of timestamp
         student_id = f"D{doctor_id}"
     elif user.role == "nurse":
         # Use a numeric ID for nurses based on timestamp
-        import time
-        nurse_id = str(int(time.time()))[-7:]  # Last 7 digits of timestamp
+        nurse_id = f"{int(time.time()):07d}"[-7:]  # Last 7 digits of timestamp
         student_id = f"N{nurse_id}"
     else:
         student_id = user.student_id
@@ -348,7 +704,7 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
     # Create user
     db_user = models.User(
         username=user.username,
-        password_hash=hash_password(user.password),
+        password_hash=password_hash,
         full_name=user.full_name,
         email=email,
         student_id=student_id,
@@ -357,30 +713,24 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
         major=user.major if user.role == "student" else (user.specialization if user.role == "doctor" else None),
         academic_year="2025/2026",
         phone=user.phone,
-        date_of_birth=datetime.strptime(user.date_of_birth, "%Y-%m-%d").date()
-        if user.date_of_birth else None,
+        date_of_birth=user.date_of_birth,
         gender=user.gender,
         year_level=user.year_level if user.role == "student" else None,
         role=user.role,
     )
 
     db.add(db_user)
-    db.flush()  # Get the user ID
 
     # If doctor, create doctor entry linked to user
     if user.role == "doctor":
-        # Generate avatar initials
-        name_parts = user.full_name.split()
-        avatar = ''.join([n[0].upper() for n in name_parts[:2]]) if len(name_parts) >= 2 else user.full_name[:2].upper()
-
         doctor = models.Doctor(
-            user_id=db_user.id,
+            user=db_user,
             name=user.full_name,
             license_number=user.license_number,
             specialty=user.specialization,
             email=email,
             phone=user.phone,
-            avatar=avatar,
+            avatar=generate_initials(user.full_name),
             rating=0.0,
             reviews_count=0,
             is_available=True
@@ -389,25 +739,30 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
 
     # If nurse, create nurse entry linked to user
     elif user.role == "nurse":
-        # Generate avatar initials
-        name_parts = user.full_name.split()
-        avatar = ''.join([n[0].upper() for n in name_parts[:2]]) if len(name_parts) >= 2 else user.full_name[:2].upper()
-
         nurse = models.Nurse(
-            user_id=db_user.id,
+            user=db_user,
             name=user.full_name,
             license_number=user.nursing_license,
             department=user.nurse_department,
             email=email,
             phone=user.phone,
-            avatar=avatar,
+            avatar=generate_initials(user.full_name),
             shift=user.shift,
             is_available=True
         )
         db.add(nurse)
 
-    db.commit()
-    db.refresh(db_user)
+    # The unique constraints are the final authority if a concurrent
+    # registration slipped in after validate_registration
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(400, "Username, email or ID already registered")
+    if user.role == "doctor":
+        invalidate_doctors_list()
+    elif user.role == "student":
+        invalidate_nurse_stats()
 
     token = create_access_token({"sub": db_user.username})
 
@@ -427,17 +782,19 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(
-        models.User.username == user.username
-    ).first()
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(
+        lambda: db.execute(
+            select(models.User).where(models.User.username == user.username)
+        ).scalar_one_or_none()
+    )
 
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+    if not db_user or not await averify_password(user.password, db_user.password_hash):
         raise HTTPException(401, "Invalid credentials")
 
     token = create_access_token({"sub": db_user.username})
 
-    return {
+    response = {
         "access_token": token,
         "token_type": "bearer",
         "user": {
@@ -451,18 +808,22 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
         }
     }
 
+    # Transparently move hashes made with an older cost to BCRYPT_ROUNDS
+    if password_needs_rehash(db_user.password_hash):
+        db_user.password_hash = await ahash_password(user.password)
+        await run_in_threadpool(db.commit)
+
+    return response
+
 
 # ---------------------------------------------------------
 # PROFILE
 # ---------------------------------------------------------
 @app.get("/profile")
 def get_profile(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_full),
 ):
-    emergency = db.query(models.EmergencyContact).filter(
-        models.EmergencyContact.user_id == current_user.id
-    ).first()
+    emergency = current_user.emergency_contact
 
     response = {
         "username": current_user.username,
@@ -472,8 +833,7 @@ def get_profile(
         "department": current_user.department,
         "major": current_user.major,
         "phone": current_user.phone,
-        "date_of_birth": current_user.date_of_birth.isoformat()
-        if current_user.date_of_birth else None,
+        "date_of_birth": current_user.date_of_birth,
         "gender": current_user.gender,
         "year_level": current_user.year_level,
         "role": current_user.role,
@@ -487,9 +847,7 @@ def get_profile(
     
     # If doctor, add doctor-specific info
     if current_user.role == "doctor":
-        doctor = db.query(models.Doctor).filter(
-            models.Doctor.user_id == current_user.id
-        ).first()
+        doctor = current_user.doctor_profile
         if doctor:
             response["license_number"] = doctor.license_number
             response["specialty"] = doctor.specialty
@@ -522,15 +880,13 @@ def update_profile(
         current_user.phone = updates.phone
 
     if updates.date_of_birth:
-        current_user.date_of_birth = datetime.strptime(
-            updates.date_of_birth, "%Y-%m-%d"
-        ).date()
+        current_user.date_of_birth = updates.date_of_birth
 
     if updates.gender:
         current_user.gender = updates.gender
 
     if updates.department:
-        if updates.department not in ["SSE", "SBA", "SSAH"]:
+        if updates.department not in DEPARTMENTS:
             raise HTTPException(400, "Invalid department")
         current_user.department = updates.department
 
@@ -541,7 +897,8 @@ def update_profile(
         current_user.year_level = updates.year_level
 
     db.commit()
-    db.refresh(current_user)
+    if updates.full_name and current_user.role == "doctor":
+        invalidate_doctors_list()
 
     return {
         "message": "Profile updated",
@@ -586,24 +943,31 @@ def get_medical_records(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    records = db.query(models.MedicalRecord).filter(
+    records = db.query(
+        models.MedicalRecord.id,
+        models.MedicalRecord.type,
+        models.MedicalRecord.name,
+        models.MedicalRecord.severity,
+        models.MedicalRecord.description,
+    ).filter(
         models.MedicalRecord.user_id == current_user.id,
         models.MedicalRecord.is_active == True
     ).all()
 
+    # Bucket the rows in a single pass
+    allergies, medications, conditions = [], [], []
+    for r in records:
+        if r.type == "allergy":
+            allergies.append({"id": r.id, "name": r.name, "severity": r.severity, "description": r.description})
+        elif r.type == "medication":
+            medications.append({"id": r.id, "name": r.name, "description": r.description})
+        elif r.type == "condition":
+            conditions.append({"id": r.id, "name": r.name, "severity": r.severity, "description": r.description})
+
     return {
-        "allergies": [
-            {"id": r.id, "name": r.name, "severity": r.severity, "description": r.description}
-            for r in records if r.type == "allergy"
-        ],
-        "medications": [
-            {"id": r.id, "name": r.name, "description": r.description}
-            for r in records if r.type == "medication"
-        ],
-        "conditions": [
-            {"id": r.id, "name": r.name, "severity": r.severity, "description": r.description}
-            for r in records if r.type == "condition"
-        ],
+        "allergies": allergies,
+        "medications": medications,
+        "conditions": conditions,
     }
 
 
@@ -613,7 +977,7 @@ def add_medical_entry(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    if entry.type not in ["allergy", "medication", "condition"]:
+    if entry.type not in MEDICAL_ENTRY_TYPES:
         raise HTTPException(400, "Invalid entry type")
 
     db_entry = models.MedicalRecord(
@@ -622,13 +986,11 @@ def add_medical_entry(
         name=entry.name,
         description=entry.description,
         severity=entry.severity,
-        diagnosed_date=datetime.strptime(entry.diagnosed_date, "%Y-%m-%d").date()
-        if entry.diagnosed_date else None,
+        diagnosed_date=entry.diagnosed_date,
     )
 
     db.add(db_entry)
     db.commit()
-    db.refresh(db_entry)
 
     return {"message": "Entry added", "id": db_entry.id}
 
@@ -640,12 +1002,9 @@ def update_medical_entry(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    entry = db.query(models.MedicalRecord).filter(
-        models.MedicalRecord.id == entry_id,
-        models.MedicalRecord.user_id == current_user.id,
-    ).first()
+    entry = db.get(models.MedicalRecord, entry_id)
 
-    if not entry:
+    if not entry or entry.user_id != current_user.id:
         raise HTTPException(404, "Entry not found")
 
     if updates.name:
@@ -667,12 +1026,9 @@ def delete_medical_entry(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    entry = db.query(models.MedicalRecord).filter(
-        models.MedicalRecord.id == entry_id,
-        models.MedicalRecord.user_id == current_user.id,
-    ).first()
+    entry = db.get(models.MedicalRecord, entry_id)
 
-    if not entry:
+    if not entry or entry.user_id != current_user.id:
         raise HTTPException(404, "Entry not found")
 
     entry.is_active = False
@@ -683,80 +1039,107 @@ def delete_medical_entry(
 # ---------------------------------------------------------
 # VISITS
 # ---------------------------------------------------------
-@app.get("/visits/all")
+def get_visit_statistics(db: Session, user_id: int) -> dict:
+    """Count a user's visits per status with a single GROUP BY"""
+    status_counts = dict(
+        db.query(models.Visit.status, func.count()).filter(
+            models.Visit.user_id == user_id
+        ).group_by(models.Visit.status).all()
+    )
+    return {
+        "total": sum(status_counts.values()),
+        "upcoming": status_counts.get("upcoming", 0),
+        "completed": status_counts.get("completed", 0),
+        "cancelled": status_counts.get("cancelled", 0)
+    }
+
+
+@app.get("/visits/stats", response_model=VisitStatistics)
+def get_visit_stats(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Visit counts only, for views that don't render the visit list"""
+    return get_visit_statistics(db, current_user.id)
+
+
+# Streams its own body: VisitHistoryOut documents the shape, it is not applied
+@app.get("/visits/all", response_model=None, responses={200: {"model": VisitHistoryOut}})
 def get_all_visits(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    visits = db.query(models.Visit).filter(
+    """Visit counts plus the visit list, newest first
+
+    The list is unbounded unless limit is given; statistics always cover
+    every visit.
+    """
+    # Doctor names are joined into the same SELECT; no ORM objects per row
+    stmt = select(
+        models.Visit.id,
+        models.Visit.visit_date.label("date"),
+        models.Visit.time_start,
+        models.Visit.time_end,
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        models.Visit.diagnosis,
+        models.Visit.type,
+        models.Visit.location,
+        models.Visit.notes,
+        models.Visit.status,
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Visit.doctor_id
+    ).where(
         models.Visit.user_id == current_user.id
-    ).order_by(models.Visit.visit_date.desc()).all()
-    
-    total = len(visits)
-    upcoming = len([v for v in visits if v.status == "upcoming"])
-    completed = len([v for v in visits if v.status == "completed"])
-    cancelled = len([v for v in visits if v.status == "cancelled"])
-    
-    return {
-        "statistics": {
-            "total": total,
-            "upcoming": upcoming,
-            "completed": completed,
-            "cancelled": cancelled
-        },
-        "visits": [
-            {
-                "id": v.id,
-                "date": v.visit_date.isoformat(),
-                "time_start": v.time_start,
-                "time_end": v.time_end,
-                "doctor_name": v.doctor.name if v.doctor else "Unknown",
-                "diagnosis": v.diagnosis,
-                "type": v.type,
-                "location": v.location,
-                "notes": v.notes,
-                "status": v.status
-            }
-            for v in visits
-        ]
-    }
+    ).order_by(models.Visit.visit_date.desc(), models.Visit.id.desc()).offset(offset).limit(limit)
+
+    # Streamed so long histories don't have to be held in memory at once;
+    # the statistics are small and go out in the opening bytes
+    statistics = orjson.dumps(get_visit_statistics(db, current_user.id))
+    return json_rows_response(stmt, b'{"statistics":' + statistics + b',"visits":[', b"]}")
 
 
 # ---------------------------------------------------------
 # DOCTORS
 # ---------------------------------------------------------
-@app.get("/doctors")
+# Returns cached bytes: rows go through DoctorOut when the body is built,
+# the declaration below is for the docs
+@app.get("/doctors", response_model=None, responses={200: {"model": List[DoctorOut]}})
 def get_doctors(db: Session = Depends(get_db)):
+    with _response_cache_lock:
+        body = _doctors_cache.get("doctors")
+    if body is not None:
+        return Response(body, media_type="application/json")
+
     # Get ALL registered doctors, not just available ones
-    doctors = db.query(models.Doctor).all()
+    stmt = select(
+        models.Doctor.id,
+        models.Doctor.name,
+        models.Doctor.specialty,
+        models.Doctor.rating,
+        models.Doctor.reviews_count.label("reviews"),
+        models.Doctor.avatar,
+        models.Doctor.email,
+        models.Doctor.phone,
+        models.Doctor.is_available,
+    )
 
-    return [
-        {
-            "id": d.id,
-            "name": d.name,
-            "specialty": d.specialty,
-            "rating": d.rating,
-            "reviews": d.reviews_count,
-            "avatar": d.avatar,
-            "email": d.email,
-            "phone": d.phone,
-            "is_available": d.is_available
-        }
-        for d in doctors
-    ]
+    # Cache the encoded body so hits skip both validation and serialization
+    doctors = [DoctorOut.model_validate(row).model_dump() for row in db.execute(stmt).mappings()]
+    body = orjson.dumps(doctors)
+    with _response_cache_lock:
+        _doctors_cache["doctors"] = body
+    return Response(body, media_type="application/json")
 
 
 @app.put("/doctor/profile")
 def update_doctor_profile(
     update_data: DoctorProfileUpdate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Update doctor's profile information"""
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
-
     # Update doctor fields
     if update_data.specialty is not None:
         doctor.specialty = update_data.specialty
@@ -766,7 +1149,7 @@ def update_doctor_profile(
         doctor.phone = update_data.phone
 
     db.commit()
-    db.refresh(doctor)
+    invalidate_doctors_list()
 
     return {
         "message": "Profile updated successfully",
@@ -779,74 +1162,52 @@ def update_doctor_profile(
 # ---------------------------------------------------------
 # PROFESSIONAL EXPERIENCE
 # ---------------------------------------------------------
-@app.get("/doctor/professional-experience")
+def get_professional_experience_rows(db: Session, doctor_id: int):
+    """Experience entries for a doctor, current position first, as plain row mappings"""
+    stmt = select(
+        models.ProfessionalExperience.id,
+        models.ProfessionalExperience.position,
+        models.ProfessionalExperience.institution,
+        models.ProfessionalExperience.start_date,
+        models.ProfessionalExperience.end_date,
+        models.ProfessionalExperience.description,
+        models.ProfessionalExperience.is_current,
+    ).where(
+        models.ProfessionalExperience.doctor_id == doctor_id
+    ).order_by(models.ProfessionalExperience.is_current.desc(), models.ProfessionalExperience.start_date.desc())
+
+    return db.execute(stmt).mappings().all()
+
+
+@app.get("/doctor/professional-experience", response_model=List[ProfessionalExperienceOut])
 def get_my_professional_experience(
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Get current doctor's professional experience"""
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
-
-    experiences = db.query(models.ProfessionalExperience).filter(
-        models.ProfessionalExperience.doctor_id == doctor.id
-    ).order_by(models.ProfessionalExperience.is_current.desc(), models.ProfessionalExperience.start_date.desc()).all()
-
-    return [
-        {
-            "id": exp.id,
-            "position": exp.position,
-            "institution": exp.institution,
-            "start_date": exp.start_date.isoformat() if exp.start_date else None,
-            "end_date": exp.end_date.isoformat() if exp.end_date else None,
-            "description": exp.description,
-            "is_current": exp.is_current
-        }
-        for exp in experiences
-    ]
+    return get_professional_experience_rows(db, doctor.id)
 
 
-@app.get("/doctors/{doctor_id}/professional-experience")
+@app.get("/doctors/{doctor_id}/professional-experience", response_model=List[ProfessionalExperienceOut])
 def get_doctor_professional_experience(doctor_id: int, db: Session = Depends(get_db)):
     """Get professional experience for a specific doctor (public endpoint for students)"""
-    doctor = db.query(models.Doctor).filter(models.Doctor.id == doctor_id).first()
-    if not doctor:
+    if not db.query(exists().where(models.Doctor.id == doctor_id)).scalar():
         raise HTTPException(status_code=404, detail="Doctor not found")
 
-    experiences = db.query(models.ProfessionalExperience).filter(
-        models.ProfessionalExperience.doctor_id == doctor_id
-    ).order_by(models.ProfessionalExperience.is_current.desc(), models.ProfessionalExperience.start_date.desc()).all()
-
-    return [
-        {
-            "id": exp.id,
-            "position": exp.position,
-            "institution": exp.institution,
-            "start_date": exp.start_date.isoformat() if exp.start_date else None,
-            "end_date": exp.end_date.isoformat() if exp.end_date else None,
-            "description": exp.description,
-            "is_current": exp.is_current
-        }
-        for exp in experiences
-    ]
+    return get_professional_experience_rows(db, doctor_id)
 
 
 @app.post("/doctor/professional-experience")
 def create_professional_experience(
     experience_data: ProfessionalExperienceCreate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Create a new professional experience entry"""
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
-
     # Parse dates
     try:
-        start_date = datetime.strptime(experience_data.start_date, "%Y-%m-%d").date()
-        end_date = datetime.strptime(experience_data.end_date, "%Y-%m-%d").date() if experience_data.end_date else None
+        start_date = date.fromisoformat(experience_data.start_date)
+        end_date = date.fromisoformat(experience_data.end_date) if experience_data.end_date else None
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
@@ -862,15 +1223,14 @@ def create_professional_experience(
 
     db.add(experience)
     db.commit()
-    db.refresh(experience)
 
     return {
         "message": "Professional experience added successfully",
         "id": experience.id,
         "position": experience.position,
         "institution": experience.institution,
-        "start_date": experience.start_date.isoformat(),
-        "end_date": experience.end_date.isoformat() if experience.end_date else None,
+        "start_date": experience.start_date,
+        "end_date": experience.end_date,
         "description": experience.description,
         "is_current": experience.is_current
     }
@@ -880,20 +1240,13 @@ def create_professional_experience(
 def update_professional_experience(
     experience_id: int,
     experience_data: ProfessionalExperienceUpdate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Update a professional experience entry"""
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
+    experience = db.get(models.ProfessionalExperience, experience_id)
 
-    experience = db.query(models.ProfessionalExperience).filter(
-        models.ProfessionalExperience.id == experience_id,
-        models.ProfessionalExperience.doctor_id == doctor.id
-    ).first()
-
-    if not experience:
+    if not experience or experience.doctor_id != doctor.id:
         raise HTTPException(status_code=404, detail="Professional experience not found")
 
     # Update fields
@@ -903,12 +1256,12 @@ def update_professional_experience(
         experience.institution = experience_data.institution
     if experience_data.start_date is not None:
         try:
-            experience.start_date = datetime.strptime(experience_data.start_date, "%Y-%m-%d").date()
+            experience.start_date = date.fromisoformat(experience_data.start_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid start_date format. Use YYYY-MM-DD")
     if experience_data.end_date is not None:
         try:
-            experience.end_date = datetime.strptime(experience_data.end_date, "%Y-%m-%d").date()
+            experience.end_date = date.fromisoformat(experience_data.end_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
     if experience_data.description is not None:
@@ -917,15 +1270,14 @@ def update_professional_experience(
         experience.is_current = experience_data.is_current
 
     db.commit()
-    db.refresh(experience)
 
     return {
         "message": "Professional experience updated successfully",
         "id": experience.id,
         "position": experience.position,
         "institution": experience.institution,
-        "start_date": experience.start_date.isoformat(),
-        "end_date": experience.end_date.isoformat() if experience.end_date else None,
+        "start_date": experience.start_date,
+        "end_date": experience.end_date,
         "description": experience.description,
         "is_current": experience.is_current
     }
@@ -934,20 +1286,13 @@ def update_professional_experience(
 @app.delete("/doctor/professional-experience/{experience_id}")
 def delete_professional_experience(
     experience_id: int,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Delete a professional experience entry"""
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
+    experience = db.get(models.ProfessionalExperience, experience_id)
 
-    experience = db.query(models.ProfessionalExperience).filter(
-        models.ProfessionalExperience.id == experience_id,
-        models.ProfessionalExperience.doctor_id == doctor.id
-    ).first()
-
-    if not experience:
+    if not experience or experience.doctor_id != doctor.id:
         raise HTTPException(status_code=404, detail="Professional experience not found")
 
     db.delete(experience)
@@ -978,39 +1323,72 @@ def create_emergency_request(
 
     db.add(emergency)
     db.commit()
+    invalidate_nurse_stats()
 
     return {"message": "Emergency request created", "id": emergency.id}
 
 
+# ---------------------------------------------------------
+# AVAILABILITY CACHE
+# ---------------------------------------------------------
+# Calendar browsing hits available-slots/availability-summary far more
+# often than bookings or schedule edits change them. Slots are keyed by
+# (doctor_id, date), summaries by doctor_id; writes pop the affected keys
+# and the TTL bounds staleness across workers.
+AVAILABILITY_CACHE_TTL = 30
+_slots_cache = TTLCache(maxsize=4096, ttl=AVAILABILITY_CACHE_TTL)
+_availability_summary_cache = TTLCache(maxsize=1024, ttl=AVAILABILITY_CACHE_TTL)
+_availability_cache_lock = threading.Lock()
+
+
+def invalidate_slots(doctor_id: int, *days: date):
+    """Drop cached slots for a doctor on the given days"""
+    with _availability_cache_lock:
+        for day in days:
+            _slots_cache.pop((doctor_id, day), None)
+
+
+def invalidate_doctor_availability(doctor_id: int):
+    """Drop every cached slot list and the summary for a doctor"""
+    with _availability_cache_lock:
+        for key in [k for k in _slots_cache if k[0] == doctor_id]:
+            _slots_cache.pop(key, None)
+        _availability_summary_cache.pop(doctor_id, None)
+
+
 # ---------------------------------------------------------
 # APPOINTMENTS
 # ---------------------------------------------------------
+# Midnight, for turning an appointment date into a datetime
+MIN_TIME = datetime.min.time()
+
+
 @app.get("/appointments")
 def get_appointments(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get all appointments for current user"""
-    appointments = db.query(models.Appointment).filter(
+    stmt = select(
+        models.Appointment.id,
+        models.Appointment.doctor_id,
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        func.coalesce(models.Doctor.specialty, "").label("doctor_specialty"),
+        models.Appointment.appointment_date.label("date"),
+        models.Appointment.appointment_time.label("time"),
+        models.Appointment.type,
+        models.Appointment.location,
+        models.Appointment.status,
+        models.Appointment.notes,
+        models.Appointment.can_reschedule,
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Appointment.doctor_id
+    ).where(
         models.Appointment.user_id == current_user.id
-    ).order_by(models.Appointment.appointment_date.desc()).all()
+    ).order_by(models.Appointment.appointment_date.desc())
     
-    return [
-        {
-            "id": a.id,
-            "doctor_id": a.doctor_id,
-            "doctor_name": a.doctor.name if a.doctor else "Unknown",
-            "doctor_specialty": a.doctor.specialty if a.doctor else "",
-            "date": a.appointment_date.isoformat() if a.appointment_date else None,
-            "time": a.appointment_time,
-            "type": a.type,
-            "location": a.location,
-            "status": a.status,
-            "notes": a.notes,
-            "can_reschedule": a.can_reschedule
-        }
-        for a in appointments
-    ]
+    # Streamed so long histories don't have to be held in memory at once
+    return json_rows_response(stmt)
 
 
 @app.post("/appointments")
@@ -1020,32 +1398,32 @@ def create_appointment(
     db: Session = Depends(get_db),
 ):
     """Create a new appointment"""
-    # Verify doctor exists
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.id == appointment.doctor_id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor not found")
-    
     # Parse date
     try:
-        appt_date = datetime.strptime(appointment.appointment_date, "%Y-%m-%d")
+        appt_date = date.fromisoformat(appointment.appointment_date)
     except ValueError:
         raise HTTPException(400, "Invalid date format. Use YYYY-MM-DD")
     
-    # Check if slot is available (basic check)
-    existing = db.query(models.Appointment).filter(
+    # Verify doctor exists and check the slot in the same round-trip
+    slot_booked = exists().where(
         models.Appointment.doctor_id == appointment.doctor_id,
         models.Appointment.appointment_date == appt_date,
         models.Appointment.appointment_time == appointment.appointment_time,
         models.Appointment.status != "cancelled"
+    )
+    doctor = db.query(
+        models.Doctor.id, models.Doctor.name, slot_booked.label("booked")
+    ).filter(
+        models.Doctor.id == appointment.doctor_id
     ).first()
     
-    if existing:
+    if not doctor:
+        raise HTTPException(404, "Doctor not found")
+    if doctor.booked:
         raise HTTPException(400, "This time slot is already booked")
     
-    # Create appointment
+    # Create appointment. The uq_appt_doctor_slot index still rejects a
+    # slot taken by a concurrent booking between the check and the insert.
     db_appointment = models.Appointment(
         user_id=current_user.id,
         doctor_id=appointment.doctor_id,
@@ -1059,21 +1437,120 @@ def create_appointment(
     )
     
     db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(400, "This time slot is already booked")
+    invalidate_slots(appointment.doctor_id, appt_date)
+    invalidate_nurse_stats()
     
     return {
         "message": "Appointment created successfully",
         "id": db_appointment.id,
-        "date": db_appointment.appointment_date.isoformat(),
+        "date": db_appointment.appointment_date,
         "time": db_appointment.appointment_time,
         "doctor": doctor.name
     }
 
 
-@app.put("/appointments/{appointment_id}")
-def update_appointment(
-    appointment_id: int,
+MAX_BULK_APPOINTMENTS = 200
+
+
+@app.post("/appointments/bulk")
+def create_appointments_bulk(
+    appointments: List[BulkAppointmentCreate],
+    current_user: models.User = Depends(require_nurse),
+    db: Session = Depends(get_db),
+):
+    """Book a batch of appointments (e.g. a day's schedule) in one transaction"""
+    if not appointments:
+        raise HTTPException(400, "No appointments provided")
+    if len(appointments) > MAX_BULK_APPOINTMENTS:
+        raise HTTPException(400, f"At most {MAX_BULK_APPOINTMENTS} appointments per request")
+
+    try:
+        dates = [date.fromisoformat(a.appointment_date) for a in appointments]
+    except ValueError:
+        raise HTTPException(400, "Invalid date format. Use YYYY-MM-DD")
+
+    slots = [(a.doctor_id, d, a.appointment_time) for a, d in zip(appointments, dates)]
+    if len(set(slots)) != len(slots):
+        raise HTTPException(400, "The batch books the same slot more than once")
+
+    # One IN query per referenced table instead of one lookup per row
+    doctor_ids = {a.doctor_id for a in appointments}
+    found_doctors = set(db.scalars(
+        select(models.Doctor.id).where(models.Doctor.id.in_(doctor_ids))
+    ))
+    if found_doctors != doctor_ids:
+        raise HTTPException(404, f"Doctor not found: {sorted(doctor_ids - found_doctors)}")
+
+    patient_ids = {a.patient_id for a in appointments}
+    found_patients = set(db.scalars(
+        select(models.User.id).where(models.User.id.in_(patient_ids))
+    ))
+    if found_patients != patient_ids:
+        raise HTTPException(404, f"Patient not found: {sorted(patient_ids - found_patients)}")
+
+    taken = db.execute(
+        select(
+            models.Appointment.doctor_id,
+            models.Appointment.appointment_date,
+            models.Appointment.appointment_time,
+        ).where(
+            tuple_(
+                models.Appointment.doctor_id,
+                models.Appointment.appointment_date,
+                models.Appointment.appointment_time,
+            ).in_(slots),
+            models.Appointment.status != "cancelled"
+        )
+    ).all()
+    if taken:
+        raise HTTPException(400, "Time slots already booked: " + ", ".join(
+            f"doctor {t.doctor_id} on {t.appointment_date} at {t.appointment_time}" for t in taken
+        ))
+
+    # Single multi-row INSERT; the unique slot index still guards races
+    try:
+        ids = db.scalars(
+            insert(models.Appointment).returning(
+                models.Appointment.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "user_id": a.patient_id,
+                    "doctor_id": a.doctor_id,
+                    "appointment_date": d,
+                    "appointment_time": a.appointment_time,
+                    "type": a.type,
+                    "location": f"Campus Health Center, Room {a.doctor_id}01",
+                    "notes": a.notes,
+                    "status": "upcoming",
+                    "can_reschedule": True,
+                }
+                for a, d in zip(appointments, dates)
+            ],
+        ).all()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(400, "One of the time slots was just booked")
+
+    for doctor_id, day, _ in slots:
+        invalidate_slots(doctor_id, day)
+    invalidate_nurse_stats()
+
+    return {
+        "message": f"{len(ids)} appointments created successfully",
+        "ids": ids
+    }
+
+
+@app.put("/appointments/{appointment_id}")
+def update_appointment(
+    appointment_id: int,
     updates: AppointmentUpdate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -1092,21 +1569,51 @@ def update_appointment(
     
     # Check 12-hour rule
     if appointment.appointment_date:
-        hours_until = (appointment.appointment_date - datetime.now()).total_seconds() / 3600
+        appointment_datetime = datetime.combine(appointment.appointment_date, MIN_TIME)
+        hours_until = (appointment_datetime - datetime.now()).total_seconds() / 3600
         if hours_until < 12:
             raise HTTPException(400, "Cannot reschedule within 12 hours of appointment")
     
     # Update fields
+    values = {
+        "appointment_date": appointment.appointment_date,
+        "appointment_time": updates.appointment_time or appointment.appointment_time,
+    }
     if updates.appointment_date:
-        appointment.appointment_date = datetime.strptime(updates.appointment_date, "%Y-%m-%d")
-    if updates.appointment_time:
-        appointment.appointment_time = updates.appointment_time
+        try:
+            values["appointment_date"] = date.fromisoformat(updates.appointment_date)
+        except ValueError:
+            raise HTTPException(400, "Invalid date format. Use YYYY-MM-DD")
     if updates.type:
-        appointment.type = updates.type
+        values["type"] = updates.type
     if updates.notes:
-        appointment.notes = updates.notes
+        values["notes"] = updates.notes
+    
+    # Apply the change only if no other booking holds the target slot, in
+    # the same statement, so the check can't go stale before the write
+    other = aliased(models.Appointment)
+    slot_taken = exists().where(
+        other.id != appointment.id,
+        other.doctor_id == appointment.doctor_id,
+        other.appointment_date == values["appointment_date"],
+        other.appointment_time == values["appointment_time"],
+        other.status != "cancelled"
+    )
+    stmt = update(models.Appointment).where(
+        models.Appointment.id == appointment.id,
+        ~slot_taken
+    ).values(**values).execution_options(synchronize_session=False)
     
-    db.commit()
+    try:
+        updated = db.execute(stmt).rowcount
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(400, "This time slot is already booked")
+    if not updated:
+        raise HTTPException(400, "This time slot is already booked")
+    invalidate_slots(appointment.doctor_id, appointment.appointment_date, values["appointment_date"])
+    invalidate_nurse_stats()
     
     return {"message": "Appointment updated successfully"}
 
@@ -1129,97 +1636,49 @@ def cancel_appointment(
     appointment.status = "cancelled"
     appointment.can_reschedule = False
     db.commit()
+    invalidate_slots(appointment.doctor_id, appointment.appointment_date)
+    invalidate_nurse_stats()
     
     return {"message": "Appointment cancelled successfully"}
 
 
-@app.get("/doctors/{doctor_id}/available-slots")
-def get_available_slots(
-    doctor_id: int,
-    date: str,
-    db: Session = Depends(get_db),
-):
-    """Get available time slots for a doctor on a specific date"""
-    # Verify doctor exists
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.id == doctor_id,
-        models.Doctor.is_available == True
-    ).first()
-
-    if not doctor:
-        raise HTTPException(404, "Doctor not found or not available")
-
-    # Parse the date
-    try:
-        appointment_date = datetime.strptime(date, "%Y-%m-%d")
-    except ValueError:
-        raise HTTPException(400, "Invalid date format. Use YYYY-MM-DD")
-
-    # Define all possible time slots (30-minute intervals)
-    all_slots = [
-        '09:00 AM', '09:30 AM', '10:00 AM', '10:30 AM',
-        '11:00 AM', '11:30 AM', '12:00 PM', '12:30 PM',
-        '02:00 PM', '02:30 PM', '03:00 PM', '03:30 PM',
-        '04:00 PM', '04:30 PM', '05:00 PM'
-    ]
-
-    # Get all booked appointments for this doctor on this date (excluding cancelled)
-    booked_appointments = db.query(models.Appointment).filter(
-        models.Appointment.doctor_id == doctor_id,
-        models.Appointment.appointment_date == appointment_date,
-        models.Appointment.status != "cancelled"
-    ).all()
-
-    # Get list of booked time slots
-    booked_slots = [apt.appointment_time for apt in booked_appointments]
-
-    # Filter out booked slots from available slots
-    available_slots = [slot for slot in all_slots if slot not in booked_slots]
-
-    return {
-        "doctor_id": doctor_id,
-        "doctor_name": doctor.name,
-        "date": date,
-        "available_slots": available_slots,
-        "booked_slots": booked_slots
-    }
-
-
-# Add this to backend/main.py after the appointments endpoints
-
 @app.get("/appointments/upcoming")
 def get_upcoming_appointments(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get upcoming appointments (future appointments that are not cancelled)"""
-    today = datetime.now().date()
-    
-    appointments = db.query(models.Appointment).filter(
+    today = date.today()
+    
+    stmt = select(
+        models.Appointment.id,
+        models.Appointment.doctor_id,
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        func.coalesce(models.Doctor.specialty, "").label("doctor_specialty"),
+        models.Appointment.appointment_date.label("date"),
+        models.Appointment.appointment_time.label("time"),
+        models.Appointment.type,
+        models.Appointment.location,
+        models.Appointment.status,
+        models.Appointment.notes,
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Appointment.doctor_id
+    ).where(
         models.Appointment.user_id == current_user.id,
         models.Appointment.appointment_date >= today,
         models.Appointment.status != "cancelled"
-    ).order_by(models.Appointment.appointment_date.asc()).all()
+    ).order_by(models.Appointment.appointment_date.asc())
     
+    now = datetime.now()
     result = []
-    for a in appointments:
+    for row in db.execute(stmt).mappings():
         # Calculate if can reschedule (12 hour rule)
-        appointment_datetime = datetime.combine(a.appointment_date, datetime.min.time())
-        hours_until = (appointment_datetime - datetime.now()).total_seconds() / 3600
-        can_reschedule = hours_until > 12
+        appointment_datetime = datetime.combine(row["date"], MIN_TIME)
+        hours_until = (appointment_datetime - now).total_seconds() / 3600
         
         result.append({
-            "id": a.id,
-            "doctor_id": a.doctor_id,
-            "doctor_name": a.doctor.name if a.doctor else "Unknown",
-            "doctor_specialty": a.doctor.specialty if a.doctor else "",
-            "date": a.appointment_date.isoformat() if a.appointment_date else None,
-            "time": a.appointment_time,
-            "type": a.type,
-            "location": a.location,
-            "status": a.status,
-            "notes": a.notes,
-            "can_reschedule": can_reschedule,
+            **row,
+            "can_reschedule": hours_until > 12,
             "hours_until": hours_until
         })
     
@@ -1238,9 +1697,7 @@ def complete_appointment(
     Mark an appointment as completed and create a visit record.
     This should be called by doctors or automatically after the appointment time.
     """
-    appointment = db.query(models.Appointment).filter(
-        models.Appointment.id == appointment_id
-    ).first()
+    appointment = db.get(models.Appointment, appointment_id)
     
     if not appointment:
         raise HTTPException(404, "Appointment not found")
@@ -1264,7 +1721,7 @@ def complete_appointment(
     
     db.add(visit)
     db.commit()
-    db.refresh(visit)
+    invalidate_nurse_stats()
     
     return {
         "message": "Appointment completed and added to visit history",
@@ -1273,33 +1730,33 @@ def complete_appointment(
     }
 
 
-@app.get("/visits/recent")
+@app.get("/visits/recent", response_model=List[VisitOut])
 def get_recent_visits(
     limit: int = 3,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get recent completed visits"""
-    visits = db.query(models.Visit).filter(
+    # Select exactly the response columns so the rows can be returned as-is
+    stmt = select(
+        models.Visit.id,
+        models.Visit.visit_date.label("date"),
+        models.Visit.time_start,
+        models.Visit.time_end,
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        models.Visit.diagnosis,
+        models.Visit.type,
+        models.Visit.location,
+        models.Visit.notes,
+        models.Visit.status,
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Visit.doctor_id
+    ).where(
         models.Visit.user_id == current_user.id,
         models.Visit.status == "completed"
-    ).order_by(models.Visit.visit_date.desc()).limit(limit).all()
-    
-    return [
-        {
-            "id": v.id,
-            "date": v.visit_date.isoformat(),
-            "time_start": v.time_start,
-            "time_end": v.time_end,
-            "doctor_name": v.doctor.name if v.doctor else "Unknown",
-            "diagnosis": v.diagnosis,
-            "type": v.type,
-            "location": v.location,
-            "notes": v.notes,
-            "status": v.status
-        }
-        for v in visits
-    ]
+    ).order_by(models.Visit.visit_date.desc()).limit(limit)
+
+    return db.execute(stmt).mappings().all()
 
 # ---------------------------------------------------------
 # PERMANENT DELETE MEDICAL RECORD
@@ -1311,12 +1768,9 @@ def permanently_delete_medical_entry(
     db: Session = Depends(get_db),
 ):
     """Permanently delete a medical entry"""
-    entry = db.query(models.MedicalRecord).filter(
-        models.MedicalRecord.id == entry_id,
-        models.MedicalRecord.user_id == current_user.id,
-    ).first()
+    entry = db.get(models.MedicalRecord, entry_id)
 
-    if not entry:
+    if not entry or entry.user_id != current_user.id:
         raise HTTPException(404, "Entry not found")
 
     db.delete(entry)
@@ -1327,108 +1781,86 @@ def permanently_delete_medical_entry(
 # ---------------------------------------------------------
 # DOCTOR DASHBOARD ENDPOINTS
 # ---------------------------------------------------------
+# Indexed by DoctorAvailability.day_of_week (0=Monday)
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
 @app.get("/doctor/patients")
 def get_doctor_patients(
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db),
 ):
     """Get patients for a doctor"""
-    if current_user.role != "doctor":
-        raise HTTPException(403, "Access denied. Doctors only.")
-    
-    # Get doctor record
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.user_id == current_user.id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor profile not found")
-    
     # Get today's appointments
-    today = datetime.now().date()
-    appointments = db.query(models.Appointment).filter(
+    today = date.today()
+    stmt = select(
+        models.Appointment.id,
+        func.coalesce(models.User.full_name, "Unknown").label("patient_name"),
+        func.coalesce(models.User.student_id, "N/A").label("patient_id"),
+        models.Appointment.appointment_time.label("time"),
+        models.Appointment.type,
+        models.Appointment.notes,
+    ).outerjoin(
+        models.User, models.User.id == models.Appointment.user_id
+    ).where(
         models.Appointment.doctor_id == doctor.id,
         models.Appointment.appointment_date == today,
         models.Appointment.status == "upcoming"
-    ).all()
+    )
     
-    return [
-        {
-            "id": a.id,
-            "patient_name": a.user.full_name if a.user else "Unknown",
-            "patient_id": a.user.student_id if a.user else "N/A",
-            "time": a.appointment_time,
-            "type": a.type,
-            "notes": a.notes
-        }
-        for a in appointments
-    ]
+    return db.execute(stmt).mappings().all()
 
 
 @app.get("/doctor/schedule")
 def get_doctor_schedule(
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db),
 ):
     """Get doctor's schedule"""
-    if current_user.role != "doctor":
-        raise HTTPException(403, "Access denied. Doctors only.")
-    
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.user_id == current_user.id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor profile not found")
-    
-    # Get all upcoming appointments
-    appointments = db.query(models.Appointment).filter(
+    # Get all upcoming appointments, patient names joined in
+    stmt = select(
+        models.Appointment.id,
+        func.coalesce(models.User.full_name, "Unknown").label("patient_name"),
+        models.Appointment.appointment_date.label("date"),
+        models.Appointment.appointment_time.label("time"),
+        models.Appointment.type,
+        models.Appointment.status,
+    ).outerjoin(
+        models.User, models.User.id == models.Appointment.user_id
+    ).where(
         models.Appointment.doctor_id == doctor.id,
         models.Appointment.status == "upcoming"
-    ).order_by(models.Appointment.appointment_date).all()
+    ).order_by(models.Appointment.appointment_date)
     
     return {
         "doctor_name": doctor.name,
         "specialty": doctor.specialty,
-        "appointments": [
-            {
-                "id": a.id,
-                "patient_name": a.user.full_name if a.user else "Unknown",
-                "date": a.appointment_date.isoformat() if a.appointment_date else None,
-                "time": a.appointment_time,
-                "type": a.type,
-                "status": a.status
-            }
-            for a in appointments
-        ]
+        "appointments": db.execute(stmt).mappings().all()
     }
 
 @app.get("/doctor/availability")
 def get_doctor_availability(
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db),
 ):
     """Get doctor's availability schedule"""
-    if current_user.role != 'doctor':
-        raise HTTPException(403, "Access denied. Doctors only.")
-    
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.user_id == current_user.id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor profile not found")
-    
-    availability = db.query(models.DoctorAvailability).filter(
+    availability = db.execute(select(
+        models.DoctorAvailability.id,
+        models.DoctorAvailability.day_of_week,
+        models.DoctorAvailability.start_time,
+        models.DoctorAvailability.end_time,
+        models.DoctorAvailability.slot_duration,
+        models.DoctorAvailability.is_active,
+    ).where(
         models.DoctorAvailability.doctor_id == doctor.id,
         models.DoctorAvailability.is_active == True
-    ).order_by(models.DoctorAvailability.day_of_week).all()
+    ).order_by(models.DoctorAvailability.day_of_week))
     
     return [
         {
             "id": a.id,
             "day_of_week": a.day_of_week,
-            "day_name": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][a.day_of_week],
+            "day_name": DAY_NAMES[a.day_of_week],
             "start_time": a.start_time,
             "end_time": a.end_time,
             "slot_duration": a.slot_duration,
@@ -1441,32 +1873,22 @@ def get_doctor_availability(
 @app.post("/doctor/availability")
 def create_doctor_availability(
     availability: DoctorAvailabilityCreate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db),
 ):
     """Create new availability slot for doctor"""
-    if current_user.role != 'doctor':
-        raise HTTPException(403, "Access denied. Doctors only.")
-    
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.user_id == current_user.id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor profile not found")
-    
     # Validate day_of_week
     if availability.day_of_week < 0 or availability.day_of_week > 6:
         raise HTTPException(400, "day_of_week must be between 0 (Monday) and 6 (Sunday)")
     
     # Check if availability already exists for this day
-    existing = db.query(models.DoctorAvailability).filter(
+    already_set = db.query(exists().where(
         models.DoctorAvailability.doctor_id == doctor.id,
         models.DoctorAvailability.day_of_week == availability.day_of_week,
         models.DoctorAvailability.is_active == True
-    ).first()
+    )).scalar()
     
-    if existing:
+    if already_set:
         raise HTTPException(400, f"Availability already exists for this day. Update or delete it first.")
     
     # Create new availability
@@ -1480,12 +1902,12 @@ def create_doctor_availability(
     
     db.add(db_availability)
     db.commit()
-    db.refresh(db_availability)
+    invalidate_doctor_availability(doctor.id)
     
     return {
         "message": "Availability created successfully",
         "id": db_availability.id,
-        "day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][db_availability.day_of_week]
+        "day": DAY_NAMES[db_availability.day_of_week]
     }
 
 
@@ -1493,20 +1915,10 @@ def create_doctor_availability(
 def update_doctor_availability(
     availability_id: int,
     updates: DoctorAvailabilityUpdate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db),
 ):
     """Update doctor availability"""
-    if current_user.role != 'doctor':
-        raise HTTPException(403, "Access denied. Doctors only.")
-    
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.user_id == current_user.id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor profile not found")
-    
     availability = db.query(models.DoctorAvailability).filter(
         models.DoctorAvailability.id == availability_id,
         models.DoctorAvailability.doctor_id == doctor.id
@@ -1525,8 +1937,9 @@ def update_doctor_availability(
     if updates.is_active is not None:
         availability.is_active = updates.is_active
     
-    availability.updated_at = datetime.utcnow()
+    availability.updated_at = models.utcnow()
     db.commit()
+    invalidate_doctor_availability(doctor.id)
     
     return {"message": "Availability updated successfully"}
 
@@ -1534,20 +1947,10 @@ def update_doctor_availability(
 @app.delete("/doctor/availability/{availability_id}")
 def delete_doctor_availability(
     availability_id: int,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db),
 ):
     """Delete doctor availability"""
-    if current_user.role != 'doctor':
-        raise HTTPException(403, "Access denied. Doctors only.")
-    
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.user_id == current_user.id
-    ).first()
-    
-    if not doctor:
-        raise HTTPException(404, "Doctor profile not found")
-    
     availability = db.query(models.DoctorAvailability).filter(
         models.DoctorAvailability.id == availability_id,
         models.DoctorAvailability.doctor_id == doctor.id
@@ -1558,21 +1961,32 @@ def delete_doctor_availability(
     
     db.delete(availability)
     db.commit()
+    invalidate_doctor_availability(doctor.id)
     
     return {"message": "Availability deleted successfully"}
 
 
 def parse_time_to_minutes(time_str: str) -> int:
     """Convert time string like '09:00 AM' to minutes since midnight"""
+    # Same rules as strptime(time_str, "%I:%M %p"): hour 1-12, minute 0-59;
+    # anything else falls back to 0
     try:
-        time_obj = datetime.strptime(time_str, "%I:%M %p")
-        return time_obj.hour * 60 + time_obj.minute
-    except:
+        clock, period = time_str.split()
+        hours, minutes = clock.split(":")
+    except (AttributeError, ValueError):
+        return 0
+    period = period.upper()
+    if (
+        time_str != time_str.strip()
+        or period not in ("AM", "PM")
+        or not (hours.isdecimal() and len(hours) <= 2 and 1 <= int(hours) <= 12)
+        or not (minutes.isdecimal() and len(minutes) <= 2 and int(minutes) <= 59)
+    ):
         return 0
+    return (int(hours) % 12 + (12 if period == "PM" else 0)) * 60 + int(minutes)
 
 
-def minutes_to_time_str(minutes: int) -> str:
-    """Convert minutes since midnight to time string like '09:00 AM'"""
+def _format_minutes(minutes: int) -> str:
     hours = minutes // 60
     mins = minutes % 60
     period = "AM" if hours < 12 else "PM"
@@ -1582,14 +1996,49 @@ def minutes_to_time_str(minutes: int) -> str:
     return f"{display_hours:02d}:{mins:02d} {period}"
 
 
+# Every minute of the day, formatted once at import
+_TIME_STRINGS = tuple(_format_minutes(m) for m in range(24 * 60))
+
+
+@lru_cache(maxsize=256)
+def generate_slot_times(start_time: str, end_time: str, slot_duration: int) -> tuple:
+    """All slot start times within working hours; doctors share few distinct schedules"""
+    if slot_duration <= 0:
+        return ()
+    start_minutes = parse_time_to_minutes(start_time)
+    end_minutes = parse_time_to_minutes(end_time)
+    return tuple(
+        _TIME_STRINGS[m] for m in range(start_minutes, end_minutes - slot_duration + 1, slot_duration)
+    )
+
+
 @app.get("/doctors/{doctor_id}/available-slots")
 def get_available_slots(
     doctor_id: int,
-    date: str,
+    date_str: str = Query(alias="date"),
     db: Session = Depends(get_db),
 ):
     """Get available time slots for a doctor on a specific date based on their availability schedule"""
-    
+    # Parse the date
+    try:
+        appointment_date = date.fromisoformat(date_str)
+    except ValueError:
+        raise HTTPException(400, "Invalid date format. Use YYYY-MM-DD")
+
+    cache_key = (doctor_id, appointment_date)
+    with _availability_cache_lock:
+        cached = _slots_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = compute_available_slots(doctor_id, date_str, appointment_date, db)
+    with _availability_cache_lock:
+        _slots_cache[cache_key] = result
+    return result
+
+
+def compute_available_slots(doctor_id: int, date_str: str, appointment_date: date, db: Session) -> dict:
+    """Build the available-slots response from the doctor's schedule and bookings"""
     # Verify doctor exists
     doctor = db.query(models.Doctor).filter(
         models.Doctor.id == doctor_id,
@@ -1599,12 +2048,6 @@ def get_available_slots(
     if not doctor:
         raise HTTPException(404, "Doctor not found or not available")
 
-    # Parse the date
-    try:
-        appointment_date = datetime.strptime(date, "%Y-%m-%d")
-    except ValueError:
-        raise HTTPException(400, "Invalid date format. Use YYYY-MM-DD")
-
     # Get day of week (0=Monday, 6=Sunday)
     day_of_week = appointment_date.weekday()
 
@@ -1619,42 +2062,35 @@ def get_available_slots(
         return {
             "doctor_id": doctor_id,
             "doctor_name": doctor.name,
-            "date": date,
+            "date": date_str,
             "available_slots": [],
             "booked_slots": [],
-            "message": f"Doctor is not available on {['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'][day_of_week]}"
+            "message": f"Doctor is not available on {DAY_NAMES[day_of_week]}"
         }
 
     # Generate time slots based on doctor's availability
-    start_minutes = parse_time_to_minutes(availability.start_time)
-    end_minutes = parse_time_to_minutes(availability.end_time)
-    slot_duration = availability.slot_duration
-
-    all_slots = []
-    current_minutes = start_minutes
-    
-    while current_minutes + slot_duration <= end_minutes:
-        slot_time = minutes_to_time_str(current_minutes)
-        all_slots.append(slot_time)
-        current_minutes += slot_duration
+    all_slots = generate_slot_times(
+        availability.start_time, availability.end_time, availability.slot_duration
+    )
 
     # Get booked appointments for this doctor on this date
-    booked_appointments = db.query(models.Appointment).filter(
-        models.Appointment.doctor_id == doctor_id,
-        models.Appointment.appointment_date == appointment_date,
-        models.Appointment.status != "cancelled"
+    booked_slots = db.scalars(
+        select(models.Appointment.appointment_time).where(
+            models.Appointment.doctor_id == doctor_id,
+            models.Appointment.appointment_date == appointment_date,
+            models.Appointment.status != "cancelled"
+        )
     ).all()
 
-    booked_slots = [apt.appointment_time for apt in booked_appointments]
-
-    # Filter out booked slots
-    available_slots = [slot for slot in all_slots if slot not in booked_slots]
+    # Filter out booked slots (set for O(1) membership)
+    booked = set(booked_slots)
+    available_slots = [slot for slot in all_slots if slot not in booked]
 
     return {
         "doctor_id": doctor_id,
         "doctor_name": doctor.name,
-        "date": date,
-        "day_of_week": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][day_of_week],
+        "date": date_str,
+        "day_of_week": DAY_NAMES[day_of_week],
         "available_slots": available_slots,
         "booked_slots": booked_slots,
         "working_hours": f"{availability.start_time} - {availability.end_time}",
@@ -1668,10 +2104,12 @@ def get_doctor_availability_summary(
     db: Session = Depends(get_db),
 ):
     """Get summary of doctor's weekly availability"""
+    with _availability_cache_lock:
+        cached = _availability_summary_cache.get(doctor_id)
+    if cached is not None:
+        return cached
     
-    doctor = db.query(models.Doctor).filter(
-        models.Doctor.id == doctor_id
-    ).first()
+    doctor = db.get(models.Doctor, doctor_id)
     
     if not doctor:
         raise HTTPException(404, "Doctor not found")
@@ -1681,10 +2119,8 @@ def get_doctor_availability_summary(
         models.DoctorAvailability.is_active == True
     ).order_by(models.DoctorAvailability.day_of_week).all()
     
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
     schedule = {}
-    for day_num, day_name in enumerate(days):
+    for day_num, day_name in enumerate(DAY_NAMES):
         day_availability = next((a for a in availability if a.day_of_week == day_num), None)
         if day_availability:
             schedule[day_name] = {
@@ -1699,11 +2135,14 @@ def get_doctor_availability_summary(
                 "slot_duration": None
             }
     
-    return {
+    result = {
         "doctor_id": doctor_id,
         "doctor_name": doctor.name,
         "schedule": schedule
     }
+    with _availability_cache_lock:
+        _availability_summary_cache[doctor_id] = result
+    return result
 
 
 # ---------------------------------------------------------
@@ -1711,20 +2150,10 @@ def get_doctor_availability_summary(
 # ---------------------------------------------------------
 @app.get("/nurse/profile")
 def get_nurse_profile(
-    current_user: models.User = Depends(get_current_user),
+    nurse: models.Nurse = Depends(get_current_nurse),
     db: Session = Depends(get_db),
 ):
     """Get nurse profile information"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
-
-    nurse = db.query(models.Nurse).filter(
-        models.Nurse.user_id == current_user.id
-    ).first()
-
-    if not nurse:
-        raise HTTPException(404, "Nurse profile not found")
-
     return {
         "id": nurse.id,
         "name": nurse.name,
@@ -1741,208 +2170,218 @@ def get_nurse_profile(
 
 @app.get("/nurse/patients/today")
 def get_nurse_patients_today(
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(require_nurse),
     db: Session = Depends(get_db),
 ):
     """Get all patients with appointments today"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
-
-    today = datetime.now().date()
+    today = date.today()
 
     # Get all appointments for today
-    appointments = db.query(models.Appointment).filter(
+    stmt = select(
+        models.Appointment.id,
+        func.coalesce(models.User.full_name, "Unknown").label("patient_name"),
+        func.coalesce(models.User.student_id, "N/A").label("patient_id"),
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        models.Appointment.appointment_time.label("time"),
+        models.Appointment.type,
+        models.Appointment.location,
+        models.Appointment.status,
+        models.Appointment.notes,
+    ).outerjoin(
+        models.User, models.User.id == models.Appointment.user_id
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Appointment.doctor_id
+    ).where(
         models.Appointment.appointment_date == today,
         models.Appointment.status.in_(["upcoming", "in_progress"])
-    ).order_by(models.Appointment.appointment_time).all()
+    ).order_by(models.Appointment.appointment_time)
 
-    return [
-        {
-            "id": a.id,
-            "patient_name": a.user.full_name if a.user else "Unknown",
-            "patient_id": a.user.student_id if a.user else "N/A",
-            "doctor_name": a.doctor.name if a.doctor else "Unknown",
-            "time": a.appointment_time,
-            "type": a.type,
-            "location": a.location,
-            "status": a.status,
-            "notes": a.notes
-        }
-        for a in appointments
-    ]
+    return db.execute(stmt).mappings().all()
 
 
 @app.get("/nurse/patients/all")
 def get_all_patients(
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(require_nurse),
     db: Session = Depends(get_db),
 ):
     """Get all registered patients (students)"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
-
-    # Get all users with role "student"
-    patients = db.query(models.User).filter(
+    # Get all users with role "student", only the columns the list shows
+    stmt = select(
+        models.User.id,
+        models.User.full_name,
+        models.User.student_id,
+        models.User.email,
+        models.User.phone,
+        models.User.department,
+        models.User.major,
+        models.User.year_level,
+    ).where(
         models.User.role == "student",
         models.User.is_active == True
-    ).order_by(models.User.full_name).all()
+    ).order_by(models.User.full_name)
 
-    return [
-        {
-            "id": p.id,
-            "full_name": p.full_name,
-            "student_id": p.student_id,
-            "email": p.email,
-            "phone": p.phone,
-            "department": p.department,
-            "major": p.major,
-            "year_level": p.year_level
-        }
-        for p in patients
-    ]
+    return db.execute(stmt).mappings().all()
 
 
 @app.get("/nurse/appointments/upcoming")
 def get_upcoming_appointments_nurse(
-    current_user: models.User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = None,
+    current_user: models.User = Depends(require_nurse),
     db: Session = Depends(get_db),
 ):
-    """Get all upcoming appointments"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
+    """Get upcoming appointments, a page at a time
 
-    # Get all upcoming appointments
-    appointments = db.query(models.Appointment).filter(
-        models.Appointment.status == "upcoming",
-        models.Appointment.appointment_date >= datetime.now().date()
-    ).order_by(
+    Pass the last id of a page as after_id to get the next one; unlike
+    offset, this stays stable while new appointments are being booked.
+    """
+    sort_key = (
         models.Appointment.appointment_date,
-        models.Appointment.appointment_time
-    ).limit(50).all()
+        models.Appointment.appointment_time,
+        models.Appointment.id,
+    )
+    # Names are joined into one projected SELECT; no ORM objects per row
+    stmt = select(
+        models.Appointment.id,
+        func.coalesce(models.User.full_name, "Unknown").label("patient_name"),
+        func.coalesce(models.User.student_id, "N/A").label("patient_id"),
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        models.Appointment.appointment_date.label("date"),
+        models.Appointment.appointment_time.label("time"),
+        models.Appointment.type,
+        models.Appointment.location,
+        models.Appointment.status,
+    ).outerjoin(
+        models.User, models.User.id == models.Appointment.user_id
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Appointment.doctor_id
+    ).where(
+        models.Appointment.status == "upcoming",
+        models.Appointment.appointment_date >= date.today()
+    )
 
-    return [
-        {
-            "id": a.id,
-            "patient_name": a.user.full_name if a.user else "Unknown",
-            "patient_id": a.user.student_id if a.user else "N/A",
-            "doctor_name": a.doctor.name if a.doctor else "Unknown",
-            "date": a.appointment_date.isoformat(),
-            "time": a.appointment_time,
-            "type": a.type,
-            "location": a.location,
-            "status": a.status
-        }
-        for a in appointments
-    ]
+    if after_id is not None:
+        anchor = db.execute(
+            select(*sort_key).where(models.Appointment.id == after_id)
+        ).first()
+        if not anchor:
+            raise HTTPException(404, "Appointment not found")
+        stmt = stmt.where(tuple_(*sort_key) > tuple_(*anchor))
+
+    stmt = stmt.order_by(*sort_key).offset(offset).limit(limit)
+    return db.execute(stmt).mappings().all()
 
 
 @app.get("/nurse/emergency-requests")
 def get_emergency_requests(
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(require_nurse),
     db: Session = Depends(get_db),
 ):
     """Get all active emergency requests"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
-
     # Get active emergency requests
-    emergency_requests = db.query(models.EmergencyRequest).filter(
+    stmt = select(
+        models.EmergencyRequest.id,
+        func.coalesce(models.User.full_name, "Unknown").label("patient_name"),
+        func.coalesce(models.User.student_id, "N/A").label("patient_id"),
+        models.EmergencyRequest.type,
+        models.EmergencyRequest.description,
+        models.EmergencyRequest.location,
+        models.EmergencyRequest.priority,
+        models.EmergencyRequest.created_at,
+        models.EmergencyRequest.status,
+    ).outerjoin(
+        models.User, models.User.id == models.EmergencyRequest.user_id
+    ).where(
         models.EmergencyRequest.status == "active"
     ).order_by(
         models.EmergencyRequest.priority.desc(),
-        models.EmergencyRequest.created_at.desc()
-    ).all()
+        models.EmergencyRequest.created_at.desc(),
+        models.EmergencyRequest.id.desc(),
+    )
 
-    return [
-        {
-            "id": e.id,
-            "patient_name": e.user.full_name if e.user else "Unknown",
-            "patient_id": e.user.student_id if e.user else "N/A",
-            "type": e.type,
-            "description": e.description,
-            "location": e.location,
-            "priority": e.priority,
-            "created_at": e.created_at.isoformat(),
-            "status": e.status
-        }
-        for e in emergency_requests
-    ]
+    return db.execute(stmt).mappings().all()
 
 
 @app.put("/nurse/emergency-requests/{request_id}/resolve")
 def resolve_emergency_request(
     request_id: int,
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(require_nurse),
     db: Session = Depends(get_db),
 ):
     """Mark an emergency request as resolved"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
-
-    emergency_request = db.query(models.EmergencyRequest).filter(
-        models.EmergencyRequest.id == request_id
-    ).first()
+    emergency_request = db.get(models.EmergencyRequest, request_id)
 
     if not emergency_request:
         raise HTTPException(404, "Emergency request not found")
 
     emergency_request.status = "resolved"
-    emergency_request.resolved_at = datetime.utcnow()
+    emergency_request.resolved_at = models.utcnow()
 
     db.commit()
-    db.refresh(emergency_request)
+    invalidate_nurse_stats()
 
     return {"message": "Emergency request resolved successfully"}
 
 
 @app.get("/nurse/stats")
 def get_nurse_stats(
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(require_nurse),
     db: Session = Depends(get_db),
 ):
     """Get statistics for nurse dashboard"""
-    if current_user.role != "nurse":
-        raise HTTPException(403, "Access denied. Nurses only.")
-
-    today = datetime.now().date()
-
-    # Count today's appointments
-    today_appointments = db.query(models.Appointment).filter(
-        models.Appointment.appointment_date == today
-    ).count()
-
-    # Count active emergency requests
-    active_emergencies = db.query(models.EmergencyRequest).filter(
-        models.EmergencyRequest.status == "active"
-    ).count()
-
-    # Count total patients
-    total_patients = db.query(models.User).filter(
-        models.User.role == "student",
-        models.User.is_active == True
-    ).count()
-
-    # Count upcoming appointments
-    upcoming_appointments = db.query(models.Appointment).filter(
-        models.Appointment.status == "upcoming",
-        models.Appointment.appointment_date >= today
-    ).count()
+    today = date.today()
+    with _response_cache_lock:
+        cached = _nurse_stats_cache.get(today)
+    if cached is not None:
+        return cached
+
+    def count_where(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+    # Both date filters share one bound parameter
+    today_param = bindparam("today", today, type_=models.Appointment.appointment_date.type)
+
+    # All four counts as scalar subqueries of a single SELECT, each one
+    # answerable from an index (see the __table_args__ in models.py)
+    stmt = select(
+        count_where(
+            models.Appointment, models.Appointment.appointment_date == today_param
+        ).label("today_appointments"),
+        count_where(
+            models.EmergencyRequest, models.EmergencyRequest.status == "active"
+        ).label("active_emergencies"),
+        count_where(
+            models.User, models.User.role == "student", models.User.is_active == True
+        ).label("total_patients"),
+        count_where(
+            models.Appointment,
+            models.Appointment.status == "upcoming",
+            models.Appointment.appointment_date >= today_param
+        ).label("upcoming_appointments"),
+    )
 
-    return {
-        "today_appointments": today_appointments,
-        "active_emergencies": active_emergencies,
-        "total_patients": total_patients,
-        "upcoming_appointments": upcoming_appointments
-    }
+    stats = dict(db.execute(stmt).mappings().one())
+    with _response_cache_lock:
+        _nurse_stats_cache[today] = stats
+    return stats
 
 
 # ---------------------------------------------------------
 # CHATBOT ENDPOINTS
 # ---------------------------------------------------------
+class UserContext(BaseModel):
+    """Fields the chat widgets send about the signed-in user"""
+    name: Optional[str] = None
+    student_id: Optional[str] = None
+    department: Optional[str] = None
+    major: Optional[str] = None
+
+
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
-    user_context: Optional[dict] = None
+    user_context: Optional[UserContext] = None
 
 
 class ChatResponse(BaseModel):
@@ -1954,15 +2393,21 @@ class ChatResponse(BaseModel):
 
 @app.post("/chat/", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
-    try:
-        from chatbot import ai_reply
+    if ai_reply is None:
+        raise HTTPException(503, "Chatbot is not available")
 
-        conversation_id = request.conversation_id or f"conv_{datetime.utcnow().timestamp()}"
+    try:
+        conversation_id = request.conversation_id or f"conv_{uuid4().hex}"
         
-        result = ai_reply(
+        # The Gemini call is blocking network I/O; keep it off the event loop
+        result = await run_in_threadpool(
+            ai_reply,
             message=request.message,
             conversation_id=conversation_id,
-            user_context=request.user_context,
+            user_context=(
+                request.user_context.model_dump(exclude_none=True)
+                if request.user_context else None
+            ),
         )
 
         return ChatResponse(
@@ -1972,8 +2417,8 @@ async def chat_endpoint(request: ChatRequest):
             mode=result.get("mode"),
         )
 
-    except Exception as e:
-        print("Chatbot error:", e)
+    except Exception:
+        logger.exception("Chatbot error")
         return ChatResponse(
             reply="I'm having technical difficulties.",
             conversation_id=request.conversation_id or "error",
@@ -1993,32 +2438,26 @@ def get_all_students(
     if current_user.role != "doctor":
         raise HTTPException(status_code=403, detail="Only doctors can access this")
 
-    students = db.query(models.User).filter(models.User.role == "student").all()
+    stmt = select(
+        models.User.id,
+        models.User.full_name,
+        models.User.student_id,
+        models.User.email,
+    ).where(models.User.role == "student")
 
-    return [
-        {
-            "id": student.id,
-            "full_name": student.full_name,
-            "student_id": student.student_id,
-            "email": student.email
-        }
-        for student in students
-    ]
+    return db.execute(stmt).mappings().all()
 
 
 @app.post("/prescriptions")
 def create_prescription(
     prescription_data: PrescriptionCreate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Create a new prescription"""
-    if current_user.role != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can create prescriptions")
-
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
+    # Verify patient exists
+    if not db.query(exists().where(models.User.id == prescription_data.patient_id)).scalar():
+        raise HTTPException(status_code=404, detail="Patient not found")
 
     prescription = models.Prescription(
         patient_id=prescription_data.patient_id,
@@ -2032,7 +2471,6 @@ def create_prescription(
 
     db.add(prescription)
     db.commit()
-    db.refresh(prescription)
 
     return {
         "message": "Prescription created successfully",
@@ -2042,54 +2480,39 @@ def create_prescription(
 
 @app.get("/doctor/prescriptions")
 def get_doctor_prescriptions(
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Get all prescriptions created by the current doctor"""
-    if current_user.role != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can access this")
-
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
-
-    prescriptions = db.query(models.Prescription).filter(
+    # Patient details come from the same query instead of one lookup per row
+    stmt = select(
+        models.Prescription.id,
+        models.Prescription.medication,
+        models.Prescription.dosage,
+        models.Prescription.frequency,
+        models.Prescription.duration,
+        models.Prescription.instructions,
+        models.Prescription.status,
+        func.coalesce(models.User.full_name, "Unknown").label("patient_name"),
+        func.coalesce(models.User.student_id, "Unknown").label("patient_id"),
+        models.Prescription.created_at,
+    ).outerjoin(
+        models.User, models.User.id == models.Prescription.patient_id
+    ).where(
         models.Prescription.doctor_id == doctor.id
-    ).order_by(models.Prescription.created_at.desc()).all()
-
-    result = []
-    for presc in prescriptions:
-        patient = db.query(models.User).filter(models.User.id == presc.patient_id).first()
-        result.append({
-            "id": presc.id,
-            "medication": presc.medication,
-            "dosage": presc.dosage,
-            "frequency": presc.frequency,
-            "duration": presc.duration,
-            "instructions": presc.instructions,
-            "status": presc.status,
-            "patient_name": patient.full_name if patient else "Unknown",
-            "patient_id": patient.student_id if patient else "Unknown",
-            "created_at": presc.created_at.isoformat() if presc.created_at else None
-        })
+    ).order_by(models.Prescription.created_at.desc(), models.Prescription.id.desc())
 
-    return result
+    # Streamed so long histories don't have to be held in memory at once
+    return json_rows_response(stmt)
 
 
 @app.delete("/prescriptions/{prescription_id}")
 def delete_prescription(
     prescription_id: int,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Delete a prescription - only the prescribing doctor can delete"""
-    if current_user.role != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can delete prescriptions")
-
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
-
     prescription = db.query(models.Prescription).filter(
         models.Prescription.id == prescription_id,
         models.Prescription.doctor_id == doctor.id  # Only allow deletion by prescribing doctor
@@ -2107,16 +2530,13 @@ def delete_prescription(
 @app.post("/referrals")
 def create_referral(
     referral_data: ReferralCreate,
-    current_user: models.User = Depends(get_current_user),
+    doctor: models.Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """Create a new referral"""
-    if current_user.role != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can create referrals")
-
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor profile not found")
+    # Verify patient exists
+    if not db.query(exists().where(models.User.id == referral_data.patient_id)).scalar():
+        raise HTTPException(status_code=404, detail="Patient not found")
 
     referral = models.Referral(
         patient_id=referral_data.patient_id,
@@ -2129,7 +2549,6 @@ def create_referral(
 
     db.add(referral)
     db.commit()
-    db.refresh(referral)
 
     return {
         "message": "Referral created successfully",
@@ -2148,8 +2567,7 @@ def add_medical_record_by_doctor(
         raise HTTPException(status_code=403, detail="Only doctors can add medical records")
 
     # Verify patient exists
-    patient = db.query(models.User).filter(models.User.id == record_data.patient_id).first()
-    if not patient:
+    if not db.query(exists().where(models.User.id == record_data.patient_id)).scalar():
         raise HTTPException(status_code=404, detail="Patient not found")
 
     medical_entry = models.MedicalRecord(
@@ -2163,7 +2581,6 @@ def add_medical_record_by_doctor(
 
     db.add(medical_entry)
     db.commit()
-    db.refresh(medical_entry)
 
     return {
         "message": "Medical record added successfully",
@@ -2177,26 +2594,24 @@ def get_my_prescriptions(
     db: Session = Depends(get_db)
 ):
     """Get all prescriptions for the current student"""
-    prescriptions = db.query(models.Prescription).filter(
+    stmt = select(
+        models.Prescription.id,
+        models.Prescription.medication,
+        models.Prescription.dosage,
+        models.Prescription.frequency,
+        models.Prescription.duration,
+        models.Prescription.instructions,
+        models.Prescription.status,
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        models.Prescription.created_at,
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Prescription.doctor_id
+    ).where(
         models.Prescription.patient_id == current_user.id
-    ).order_by(models.Prescription.created_at.desc()).all()
+    ).order_by(models.Prescription.created_at.desc(), models.Prescription.id.desc())
 
-    result = []
-    for presc in prescriptions:
-        doctor = db.query(models.Doctor).filter(models.Doctor.id == presc.doctor_id).first()
-        result.append({
-            "id": presc.id,
-            "medication": presc.medication,
-            "dosage": presc.dosage,
-            "frequency": presc.frequency,
-            "duration": presc.duration,
-            "instructions": presc.instructions,
-            "status": presc.status,
-            "doctor_name": doctor.name if doctor else "Unknown",
-            "created_at": presc.created_at.isoformat() if presc.created_at else None
-        })
-
-    return result
+    # Streamed so long histories don't have to be held in memory at once
+    return json_rows_response(stmt)
 
 
 @app.get("/my-referrals")
@@ -2205,25 +2620,50 @@ def get_my_referrals(
     db: Session = Depends(get_db)
 ):
     """Get all referrals for the current student"""
-    referrals = db.query(models.Referral).filter(
+    stmt = select(
+        models.Referral.id,
+        models.Referral.specialist_type,
+        models.Referral.reason,
+        models.Referral.priority,
+        models.Referral.notes,
+        models.Referral.status,
+        func.coalesce(models.Doctor.name, "Unknown").label("doctor_name"),
+        models.Referral.created_at,
+    ).outerjoin(
+        models.Doctor, models.Doctor.id == models.Referral.doctor_id
+    ).where(
         models.Referral.patient_id == current_user.id
-    ).order_by(models.Referral.created_at.desc()).all()
+    ).order_by(models.Referral.created_at.desc(), models.Referral.id.desc())
 
-    result = []
-    for ref in referrals:
-        doctor = db.query(models.Doctor).filter(models.Doctor.id == ref.doctor_id).first()
-        result.append({
-            "id": ref.id,
-            "specialist_type": ref.specialist_type,
-            "reason": ref.reason,
-            "priority": ref.priority,
-            "notes": ref.notes,
-            "status": ref.status,
-            "doctor_name": doctor.name if doctor else "Unknown",
-            "created_at": ref.created_at.isoformat() if ref.created_at else None
-        })
+    # Streamed so long histories don't have to be held in memory at once
+    return json_rows_response(stmt)
 
-    return result
+
+# ---------------------------------------------------------
+# DIAGNOSTICS
+# ---------------------------------------------------------
+@app.get("/debug/pool")
+async def debug_pool(current_user: models.User = Depends(get_current_user)):
+    """Connection pool status and recent request latency percentiles (admins only)"""
+    if current_user.role != "admin":
+        raise HTTPException(403, "Access denied. Admins only.")
+
+    latencies = sorted(_request_latencies)
+
+    def percentile(p: float):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+    return {
+        "pool": engine.pool.status(),
+        "requests_sampled": len(latencies),
+        "latency_ms": {
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        },
+    }
 
 
 # ---------------------------------------------------------
@@ -2232,10 +2672,42 @@ def get_my_referrals(
 @app.on_event("startup")
 def startup_event():
     """Initialize database on startup"""
+    # Under `python main.py` the parent process has already done this once;
+    # workers running it concurrently would race on create_all/seed_db
+    if os.getenv("CARECONNECT_DB_INITIALIZED"):
+        return
     from database import init_db
     init_db()
 
 
+# Sync endpoints run on AnyIO worker threads, capped at 40 by default. Where
+# database.py configures the pool (non-SQLite), let as many run as it can
+# serve, so requests wait on connections rather than on threads. Otherwise
+# keep AnyIO's default unless THREADPOOL_SIZE is set.
+if os.getenv("THREADPOOL_SIZE"):
+    THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE"))
+elif engine.dialect.name != "sqlite":
+    THREADPOOL_SIZE = DB_POOL_SIZE + DB_MAX_OVERFLOW
+else:
+    THREADPOOL_SIZE = None
+
+
+@app.on_event("startup")
+async def configure_threadpool():
+    """Resize the worker thread limiter used for sync endpoints"""
+    if THREADPOOL_SIZE:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+async def report_bcrypt_cost():
+    """Time one hash at BCRYPT_ROUNDS so the cost can be tuned for this host"""
+    started = time.perf_counter()
+    await ahash_password("benchmark")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"🔐 bcrypt cost {BCRYPT_ROUNDS}: {elapsed_ms:.0f} ms per hash")
+
+
 # ---------------------------------------------------------
 # RUN SERVER
 # ---------------------------------------------------------
@@ -2244,4 +2716,20 @@ if __name__ == "__main__":
     print("🚀 Starting CareConnect API Server...")
     print("📍 Server: http://127.0.0.1:8000")
     print("📚 Docs: http://127.0.0.1:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Create and seed the schema once, before any worker starts
+    from database import init_db
+    init_db()
+    os.environ["CARECONNECT_DB_INITIALIZED"] = "1"
+    # Workers need an import string; uvloop/httptools come with uvicorn[standard]
+    # and "auto" falls back to asyncio/h11 where they are unavailable (Windows).
+    # One worker by default: the response/token caches and their invalidation
+    # are per process, so raise WEB_CONCURRENCY only where that is acceptable.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="auto",
+        log_level=os.getenv("LOG_LEVEL", "warning"),
+    )
@@ -5,8 +5,8 @@ Run this to add the doctor_availability table to existing databases
 Usage: python migrate_availability.py
 """
 
-from sqlalchemy import create_engine, text
-from database import DATABASE_URL, SessionLocal
+from sqlalchemy import insert, select, text
+from database import engine, SessionLocal
 import models
 
 def migrate_database():
@@ -15,9 +15,6 @@ def migrate_database():
     print("🔄 Starting database migration...")
     
     try:
-        # Create engine
-        engine = create_engine(DATABASE_URL)
-        
         # Create the new table
         print("📋 Creating doctor_availability table...")
         models.DoctorAvailability.__table__.create(engine, checkfirst=True)
@@ -33,30 +30,35 @@ def migrate_database():
             print("⚠️  No doctors found in database")
             return
         
+        # One query for every doctor that already has a schedule
+        scheduled = set(db.execute(
+            select(models.DoctorAvailability.doctor_id).distinct()
+        ).scalars())
+
+        rows = []
         for doctor in doctors:
-            # Check if doctor already has availability
-            existing = db.query(models.DoctorAvailability).filter(
-                models.DoctorAvailability.doctor_id == doctor.id
-            ).first()
-            
-            if existing:
+            if doctor.id in scheduled:
                 print(f"⚠️  Doctor {doctor.name} already has availability, skipping...")
                 continue
             
             print(f"Adding default schedule for {doctor.name}...")
             
             # Add default Monday-Friday, 9 AM - 5 PM schedule
-            for day in range(5):  # Monday to Friday
-                availability = models.DoctorAvailability(
-                    doctor_id=doctor.id,
-                    day_of_week=day,
-                    start_time="09:00 AM",
-                    end_time="05:00 PM",
-                    slot_duration=30
-                )
-                db.add(availability)
-            
-            print(f"✅ Added default schedule for {doctor.name}")
+            rows.extend(
+                {
+                    "doctor_id": doctor.id,
+                    "day_of_week": day,
+                    "start_time": "09:00 AM",
+                    "end_time": "05:00 PM",
+                    "slot_duration": 30,
+                }
+                for day in range(5)  # Monday to Friday
+            )
+        
+        # Single executemany INSERT for all the new rows
+        if rows:
+            db.execute(insert(models.DoctorAvailability), rows)
+            print(f"✅ Added default schedules for {len(rows) // 5} doctor(s)")
         
         db.commit()
         db.close()
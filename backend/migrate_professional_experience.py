@@ -5,8 +5,7 @@ Run this to add the professional_experience table to existing databases
 Usage: python migrate_professional_experience.py
 """
 
-from sqlalchemy import create_engine
-from database import DATABASE_URL, SessionLocal
+from database import engine, SessionLocal
 import models
 
 def migrate_database():
@@ -15,9 +14,6 @@ def migrate_database():
     print("🔄 Starting database migration...")
 
     try:
-        # Create engine
-        engine = create_engine(DATABASE_URL)
-
         # Create the new table
         print("📋 Creating professional_experience table...")
         models.ProfessionalExperience.__table__.create(engine, checkfirst=True)
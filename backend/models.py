@@ -1,14 +1,45 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Float, Date, Time
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Float, Date, Time, Index
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship as orm_relationship
-from datetime import datetime
+from sqlalchemy.sql.functions import FunctionElement
 
 Base = declarative_base()
 
+
+class utcnow(FunctionElement):
+    """Current UTC time from the database clock, for naive DateTime columns"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # now() is in the session time zone; convert before dropping the zone
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP only has whole seconds; %f keeps milliseconds
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+# Eager-loading convention for queries against these models:
+# single-valued relationships (Appointment.user, Visit.doctor, ...) use
+# joinedload, one JOIN in the same SELECT. Collections (User.appointments,
+# Doctor.availability_slots, ...) use selectinload, one extra
+# "WHERE id IN (...)" query, since a JOIN repeats the parent row once per child.
+
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
@@ -24,29 +55,35 @@ class User(Base):
     gender = Column(String(20))
     role = Column(String(20), default="student")
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # Patient counts and student listings filter on role + is_active
+    __table_args__ = (
+        Index("ix_user_role_active", role, is_active),
+    )
     
-    # Relationships
-    medical_records = orm_relationship("MedicalRecord", back_populates="user", cascade="all, delete-orphan")
-    appointments = orm_relationship("Appointment", back_populates="user", cascade="all, delete-orphan")
-    emergency_requests = orm_relationship("EmergencyRequest", back_populates="user", cascade="all, delete-orphan")
-    emergency_contact = orm_relationship("EmergencyContact", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    doctor_profile = orm_relationship("Doctor", back_populates="user", uselist=False)
-    nurse_profile = orm_relationship("Nurse", back_populates="user", uselist=False)
+    # Relationships. Every FK to users/doctors carries ON DELETE CASCADE (or
+    # SET NULL where nullable), so deletes leave child rows to the database
+    medical_records = orm_relationship("MedicalRecord", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    appointments = orm_relationship("Appointment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    emergency_requests = orm_relationship("EmergencyRequest", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    emergency_contact = orm_relationship("EmergencyContact", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    doctor_profile = orm_relationship("Doctor", back_populates="user", uselist=False, passive_deletes="all")
+    nurse_profile = orm_relationship("Nurse", back_populates="user", uselist=False, passive_deletes="all")
 
 
 class EmergencyContact(Base):
     __tablename__ = "emergency_contacts"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True)
     name = Column(String(100), nullable=False)
     relationship = Column(String(50), nullable=False)
     phone = Column(String(20), nullable=False)
     email = Column(String(100))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
     
     # Relationships
     user = orm_relationship("User", back_populates="emergency_contact")
@@ -55,16 +92,21 @@ class EmergencyContact(Base):
 class MedicalRecord(Base):
     __tablename__ = "medical_records"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     type = Column(String(20), nullable=False)
     name = Column(String(100), nullable=False)
     description = Column(Text)
     severity = Column(String(20))
     diagnosed_date = Column(Date)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # A user's active records (the medical records page)
+    __table_args__ = (
+        Index("ix_medrec_user_active", user_id, is_active),
+    )
     
     # Relationships
     user = orm_relationship("User", back_populates="medical_records")
@@ -73,9 +115,9 @@ class MedicalRecord(Base):
 class Visit(Base):
     __tablename__ = "visits"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"))
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="SET NULL"))
     visit_date = Column(Date, nullable=False)
     time_start = Column(String(10))
     time_end = Column(String(10))
@@ -84,8 +126,16 @@ class Visit(Base):
     location = Column(String(100))
     notes = Column(Text)
     status = Column(String(20), default="completed")
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # Serves the per-status counts and the "recent completed visits" lookup
+    # (user_id + status equality, then visit_date order), and the full
+    # history list in its (visit_date, id) newest-first order
+    __table_args__ = (
+        Index("ix_visit_user_status_date", user_id, status, visit_date.desc()),
+        Index("ix_visit_user_date", user_id, visit_date.desc(), id.desc()),
+    )
     
     # Relationships
     user = orm_relationship("User")
@@ -95,8 +145,8 @@ class Visit(Base):
 class Doctor(Base):
     __tablename__ = "doctors"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), unique=True, nullable=True)
     name = Column(String(100), nullable=False)
     license_number = Column(String(50), unique=True, nullable=True)
     specialty = Column(String(100))
@@ -106,20 +156,20 @@ class Doctor(Base):
     reviews_count = Column(Integer, default=0)
     avatar = Column(String(10))
     is_available = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
 
     # Relationships
     user = orm_relationship("User", back_populates="doctor_profile")
-    appointments = orm_relationship("Appointment", back_populates="doctor")
-    availability_slots = orm_relationship("DoctorAvailability", back_populates="doctor", cascade="all, delete-orphan")
-    professional_experiences = orm_relationship("ProfessionalExperience", back_populates="doctor", cascade="all, delete-orphan")
+    appointments = orm_relationship("Appointment", back_populates="doctor", passive_deletes="all")
+    availability_slots = orm_relationship("DoctorAvailability", back_populates="doctor", cascade="all, delete-orphan", passive_deletes=True)
+    professional_experiences = orm_relationship("ProfessionalExperience", back_populates="doctor", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Nurse(Base):
     __tablename__ = "nurses"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), unique=True, nullable=True)
     name = Column(String(100), nullable=False)
     license_number = Column(String(50), unique=True, nullable=True)
     department = Column(String(100))
@@ -128,7 +178,7 @@ class Nurse(Base):
     avatar = Column(String(10))
     is_available = Column(Boolean, default=True)
     shift = Column(String(20))  # morning, afternoon, night
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
 
     # Relationships
     user = orm_relationship("User", back_populates="nurse_profile")
@@ -138,16 +188,16 @@ class ProfessionalExperience(Base):
     """Doctor's professional experience and work history"""
     __tablename__ = "professional_experience"
 
-    id = Column(Integer, primary_key=True, index=True)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
     position = Column(String(200), nullable=False)  # e.g., "Senior Cardiologist"
     institution = Column(String(200), nullable=False)  # e.g., "Johns Hopkins Hospital"
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=True)  # NULL if current position
     description = Column(Text)  # Detailed description of responsibilities
     is_current = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
 
     # Relationships
     doctor = orm_relationship("Doctor", back_populates="professional_experiences")
@@ -157,15 +207,21 @@ class DoctorAvailability(Base):
     """Doctor's availability schedule"""
     __tablename__ = "doctor_availability"
     
-    id = Column(Integer, primary_key=True, index=True)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
     day_of_week = Column(Integer, nullable=False)  # 0=Monday, 6=Sunday
     start_time = Column(String(10), nullable=False)  # e.g., "09:00 AM"
     end_time = Column(String(10), nullable=False)    # e.g., "05:00 PM"
     slot_duration = Column(Integer, default=30)      # Duration in minutes
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # A doctor's active schedule: exact (doctor, day) lookups for slot
+    # generation, and the weekly summary in day_of_week order
+    __table_args__ = (
+        Index("ix_avail_doctor_active_day", doctor_id, is_active, day_of_week),
+    )
     
     # Relationships
     doctor = orm_relationship("Doctor", back_populates="availability_slots")
@@ -174,9 +230,9 @@ class DoctorAvailability(Base):
 class Appointment(Base):
     __tablename__ = "appointments"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
     appointment_date = Column(Date, nullable=False)
     appointment_time = Column(String(10))
     type = Column(String(50), default="General Consultation")
@@ -184,8 +240,30 @@ class Appointment(Base):
     status = Column(String(20), default="upcoming")
     notes = Column(Text)
     can_reschedule = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # Partial index for the doctor dashboard's "upcoming" lookups, a unique
+    # slot index so two bookings can't race into the same slot (it also
+    # serves doctor + date lookups), and the patient-side listing index
+    __table_args__ = (
+        Index(
+            "ix_appt_doctor_upcoming", doctor_id, appointment_date,
+            postgresql_where=status == "upcoming",
+            sqlite_where=status == "upcoming",
+        ),
+        Index(
+            "uq_appt_doctor_slot", doctor_id, appointment_date, appointment_time,
+            unique=True,
+            postgresql_where=status != "cancelled",
+            sqlite_where=status != "cancelled",
+        ),
+        Index("ix_appt_user_date_status", user_id, appointment_date, status),
+        # Clinic-wide upcoming list, already in (date, time) order
+        Index("ix_appt_status_date_time", status, appointment_date, appointment_time),
+        # Clinic-wide per-day lookups (nurse stats, today's patients)
+        Index("ix_appt_date_status", appointment_date, status),
+    )
     
     # Relationships
     user = orm_relationship("User", back_populates="appointments")
@@ -195,8 +273,8 @@ class Appointment(Base):
 class EmergencyRequest(Base):
     __tablename__ = "emergency_requests"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     type = Column(String(50))
     description = Column(Text, nullable=False)
     location = Column(String(200))
@@ -204,9 +282,14 @@ class EmergencyRequest(Base):
     longitude = Column(Float)
     status = Column(String(20), default="active")
     priority = Column(String(20), default="high")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
     resolved_at = Column(DateTime)
 
+    # Active-request count and the nurse queue (status, then priority/age order)
+    __table_args__ = (
+        Index("ix_emerg_status_priority_created", status, priority.desc(), created_at.desc(), id.desc()),
+    )
+
     # Relationships
     user = orm_relationship("User", back_populates="emergency_requests")
 
@@ -215,17 +298,23 @@ class Prescription(Base):
     """Prescriptions issued by doctors to patients"""
     __tablename__ = "prescriptions"
 
-    id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
     medication = Column(String(200), nullable=False)
     dosage = Column(String(100), nullable=False)
     frequency = Column(String(100), nullable=False)
     duration = Column(String(100), nullable=False)
     instructions = Column(Text)
     status = Column(String(20), default="active")  # active, completed, cancelled
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # Doctor-side and student-side lists, both newest first
+    __table_args__ = (
+        Index("ix_presc_doctor_created", doctor_id, created_at.desc(), id.desc()),
+        Index("ix_presc_patient_created", patient_id, created_at.desc(), id.desc()),
+    )
 
     # Relationships
     patient = orm_relationship("User", foreign_keys=[patient_id])
@@ -236,16 +325,21 @@ class Referral(Base):
     """Referrals to specialists created by doctors"""
     __tablename__ = "referrals"
 
-    id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
     specialist_type = Column(String(100), nullable=False)
     reason = Column(Text, nullable=False)
     priority = Column(String(20), default="routine")  # routine, urgent, emergency
     notes = Column(Text)
     status = Column(String(20), default="pending")  # pending, scheduled, completed
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), onupdate=utcnow())
+
+    # Student-side list, newest first
+    __table_args__ = (
+        Index("ix_referral_patient_created", patient_id, created_at.desc(), id.desc()),
+    )
 
     # Relationships
     patient = orm_relationship("User", foreign_keys=[patient_id])
@@ -1,32 +1,53 @@
 """
 Database Recreation Script
-Run this to recreate the database with the new Nurse table
+Run this to recreate the database with the current schema: the Nurse table,
+indexes, and the ON DELETE clauses that user/doctor deletes rely on
 """
 
 import os
+from sqlalchemy import inspect, text
 from database import engine
 from models import Base
 
-def recreate_database():
-    db_path = "healthcare.db"
+def confirm_delete(target):
+    print(f"\n⚠️  Found existing database: {target}")
+    response = input("❓ Do you want to DELETE it and create a new one? (yes/no): ")
+    return response.lower() in ['yes', 'y']
 
+def recreate_database():
     print("=" * 60)
     print("DATABASE RECREATION SCRIPT")
     print("=" * 60)
 
-    # Check if database exists
-    if os.path.exists(db_path):
-        print(f"\n⚠️  Found existing database: {db_path}")
-        response = input("❓ Do you want to DELETE it and create a new one? (yes/no): ")
+    if engine.dialect.name == "sqlite":
+        db_path = engine.url.database
+
+        # Check if database exists
+        if db_path and os.path.exists(db_path):
+            if not confirm_delete(db_path):
+                print("❌ Aborted. Database not modified.")
+                return
+
+            # Close pooled connections so nothing holds the file open
+            print(f"🗑️  Deleting old database...")
+            engine.dispose()
+            os.remove(db_path)
+            print(f"✅ Old database deleted")
 
-        if response.lower() not in ['yes', 'y']:
+    elif inspect(engine).get_table_names():
+        if not confirm_delete(engine.url.render_as_string(hide_password=True)):
             print("❌ Aborted. Database not modified.")
             return
 
-        # Delete old database
-        print(f"🗑️  Deleting old database...")
-        os.remove(db_path)
-        print(f"✅ Old database deleted")
+        # Drop everything server-side in one transaction
+        print(f"🗑️  Dropping old tables...")
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("DROP SCHEMA public CASCADE"))
+                conn.execute(text("CREATE SCHEMA public"))
+            else:
+                Base.metadata.drop_all(bind=conn)
+        print(f"✅ Old tables dropped")
 
     # Create new database with all tables
     print(f"\n🔨 Creating new database with all tables...")
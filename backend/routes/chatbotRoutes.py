@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
 import uuid
 from chatbot import ai_reply, clear_conversation, get_health_advice, analyze_urgency
 
-router = APIRouter(prefix="/chat", tags=["Chatbot"])
+router = APIRouter(prefix="/chat", tags=["Chatbot"], default_response_class=ORJSONResponse)
 
 class ChatMessage(BaseModel):
     message: str
@@ -24,7 +25,7 @@ def chat(data: ChatMessage):
     """
     # Generate conversation ID if not provided
     if not data.conversation_id:
-        data.conversation_id = str(uuid.uuid4())
+        data.conversation_id = uuid.uuid4().hex
     
     # Analyze urgency
     urgency = analyze_urgency(data.message)
@@ -66,18 +67,23 @@ def clear_chat(data: ConversationClear):
         return {"message": "Conversation cleared successfully"}
     return {"message": "Conversation not found or already cleared"}
 
+# Static payload for /chat/health, built once at import
+FEATURES = (
+    "Multi-language support (English, French, Arabic)",
+    "Conversation memory",
+    "Urgency detection",
+    "Health guidance"
+)
+
+HEALTH_RESPONSE = {
+    "status": "operational",
+    "service": "CareConnect Health Assistant",
+    "features": FEATURES
+}
+
 @router.get("/health")
-def chatbot_health():
+async def chatbot_health():
     """
     Check if chatbot service is operational
     """
-    return {
-        "status": "operational",
-        "service": "CareConnect Health Assistant",
-        "features": [
-            "Multi-language support (English, French, Arabic)",
-            "Conversation memory",
-            "Urgency detection",
-            "Health guidance"
-        ]
-    }
\ No newline at end of file
+    return HEALTH_RESPONSE
\ No newline at end of file